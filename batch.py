@@ -0,0 +1,159 @@
+"""Headless λ/μ1/μ2 computation over many graphs.
+
+    python batch.py graphs/ more.gbin - --output results.jsonl --workers 32
+
+Inputs are graph store files (.gbin), legacy pickles (.pkl), edge-list text
+files (.txt, .edges, .el: one "u v" pair per line, "#" comments), graph6
+(.g6) or sparse6 (.s6) files with one graph per line, NumPy adjacency
+matrices (.npy) or directories holding any of these (see ingest.py).
+
+"-" reads edge lists from stdin, one graph per block of lines separated by
+a blank line. One JSONL or CSV row is written per graph as soon as it is
+done; the names of finished graphs go to a checkpoint file, and a rerun
+with the same arguments skips them.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ingest import GRAPH6_SUFFIXES, SPARSE6_SUFFIXES, SUFFIXES, iter_edge_list_blocks, iter_graph_file, load_graph_file
+from logic import compact_eigenvalue, compact_mu1, compact_mu2
+
+FIELDS = ["graph", "nodes", "edges", "lambda", "mu1", "mu2", "lambda_seconds", "mu1_seconds", "mu2_seconds", "error"]
+
+
+def iter_inputs(sources):
+    """Yields (name, path or CompactGraph) for every graph named on the
+    command line. Files are loaded by the worker, not here."""
+    for source in sources:
+        if source == "-":
+            yield from iter_edge_list_blocks(sys.stdin, "stdin")
+        elif os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for file in sorted(files):
+                    if file.lower().endswith(SUFFIXES):
+                        yield from _file_inputs(os.path.join(root, file))
+        else:
+            yield from _file_inputs(source)
+
+
+def _file_inputs(path):
+    # graph6/sparse6 files may hold many graphs; they are split up here.
+    if path.lower().endswith(GRAPH6_SUFFIXES + SPARSE6_SUFFIXES):
+        yield from iter_graph_file(path)
+    else:
+        yield path, path
+
+
+def analyse(name, graph):
+    row = {"graph": name}
+    try:
+        if isinstance(graph, str):
+            graph = load_graph_file(graph)
+        row["nodes"] = graph.n
+        row["edges"] = graph.number_of_edges()
+        stars = []
+
+        def mu1():
+            value, values = compact_mu1(graph)
+            stars.extend(values)
+            return value
+
+        # μ2 reuses the star eigenvalues computed for μ1.
+        for field, compute in (
+            ("lambda", lambda: compact_eigenvalue(graph)),
+            ("mu1", mu1),
+            ("mu2", lambda: compact_mu2(graph, stars)),
+        ):
+            start = time.perf_counter()
+            row[field] = float(compute())
+            row[field + "_seconds"] = round(time.perf_counter() - start, 6)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+class ResultWriter:
+    def __init__(self, path, fmt, checkpoint):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a", newline="")
+        self.fmt = fmt
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, FIELDS)
+            if not exists:
+                self.csv.writeheader()
+        self.checkpoint = open(checkpoint, "a")
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        # The checkpoint entry only goes out once the row is on disk.
+        self.checkpoint.write(row["graph"] + "\n")
+        self.checkpoint.flush()
+        os.fsync(self.checkpoint.fileno())
+
+    def close(self):
+        self.file.close()
+        self.checkpoint.close()
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run(sources, output, fmt="jsonl", workers=None, checkpoint=None):
+    checkpoint = checkpoint or output + ".done"
+    done = read_checkpoint(checkpoint)
+    writer = ResultWriter(output, fmt, checkpoint)
+    todo = ((name, graph) for name, graph in iter_inputs(sources) if name not in done)
+    count = 0
+    try:
+        if workers == 1:
+            for name, graph in todo:
+                writer.write(analyse(name, graph))
+                count += 1
+            return count
+        with ProcessPoolExecutor(workers) as pool:
+            limit = 4 * (workers or os.cpu_count() or 1)
+            pending = set()
+            for name, graph in todo:
+                pending.add(pool.submit(analyse, name, graph))
+                if len(pending) >= limit:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        writer.write(future.result())
+                        count += 1
+            for future in wait(pending).done:
+                writer.write(future.result())
+                count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute λ, μ1 and μ2 for many graphs without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="graph files, directories, or - for edge lists on stdin")
+    parser.add_argument("-o", "--output", required=True, help="result file, appended to")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default=None, help="defaults to the output file suffix")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--checkpoint", default=None, help="finished graph names (default: OUTPUT.done)")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    count = run(args.inputs, args.output, fmt, args.workers, args.checkpoint)
+    print(f"{count} graphs written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Benchmarks for the blow-up eigenvalue pipeline.
+
+    python bench.py -o bench.json
+    python bench.py --quick --baseline bench.json
+
+Every case runs the stages of `logic.compact_eigenvalue` separately:
+converting the networkx graph, the canonical key and cache lookup,
+enumerating the signed cliques, building the blow-up simplex and forbidden
+tables, assembling the transition matrix and solving for the Perron root.
+Times are the best of --repeat runs; peak memory is measured in an extra
+run under tracemalloc. With --baseline, every stage is compared against an
+earlier JSON report and the exit status is 1 if one got slower by more than
+--threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import scipy
+
+from cliques import signed_clique_complex
+from compact import CompactGraph
+from graphstore import load_graph
+from logic import EigenvalueCache, blowup, unblowup
+from spectral import spectral_radius
+from transition import blowup_tables, transition_csr
+
+STAGES = ["convert", "cache", "enumerate", "blowup", "matrix", "solve"]
+NOISE_SECONDS = 5e-3
+EXAMPLES = ["pentagon.pkl", "double_triangle.pkl", "big_dipper.pkl", "lobsided_x.pkl"]
+EXAMPLE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def gnp(n, p, seed):
+    return nx.gnp_random_graph(n, p, seed=random.Random(seed).randrange(2**32))
+
+
+def iterated_blowup(graph, times):
+    for _ in range(times):
+        graph = blowup(graph)
+    return graph
+
+
+def example(path):
+    return unblowup(load_graph(os.path.join(EXAMPLE_DIR, path))[0])
+
+
+def cases(quick=False):
+    """(name, family, make) for every benchmark graph; `make()` builds the
+    graph, so unselected cases cost nothing."""
+    sizes = [5, 10, 20] if quick else [5, 10, 20, 40, 80]
+    for path in EXAMPLES:
+        yield path, "example", lambda path=path: example(path)
+    for n in sizes:
+        yield f"cycle-{n}", "cycle", lambda n=n: nx.cycle_graph(n)
+    for n in sizes:
+        yield f"wheel-{n}", "wheel", lambda n=n: nx.wheel_graph(n)
+    # Clique counts of dense random graphs grow exponentially; p = 0.5
+    # stops at 20 vertices (a few thousand simplices).
+    for n in sizes[:4]:
+        for p in (0.2, 0.5):
+            if p * n <= 10:
+                yield f"gnp-{n}-{p}", "gnp", lambda n=n, p=p: gnp(n, p, seed=n)
+    for times in range(1, 3 if quick else 4):
+        yield f"c5-blowup-{times}", "blowup", lambda times=times: iterated_blowup(nx.cycle_graph(5), times)
+
+
+def run_stages(graph, clock):
+    """Runs the pipeline once; `clock(stage)` is called after each stage.
+    The cache stage is the canonical key and lookup of `compact_eigenvalue`
+    (always a miss, on an empty in-memory cache)."""
+    compact = CompactGraph.from_networkx(graph)
+    clock("convert")
+    EigenvalueCache().lookup(compact)
+    clock("cache")
+    complex_ = signed_clique_complex(compact.masks)
+    clock("enumerate")
+    simplices, forbidden = blowup_tables(compact.masks, *complex_)
+    clock("blowup")
+    matrix = transition_csr(simplices, forbidden)
+    clock("matrix")
+    value = spectral_radius(matrix)
+    clock("solve")
+    return value, len(simplices), matrix.nnz
+
+
+def measure(name, family, graph, repeat=3):
+    seconds = {stage: float("inf") for stage in STAGES}
+    for _ in range(repeat):
+        last = [time.perf_counter()]
+
+        def clock(stage):
+            now = time.perf_counter()
+            seconds[stage] = min(seconds[stage], now - last[0])
+            last[0] = now
+
+        value, simplices, nnz = run_stages(graph, clock)
+
+    peaks = {}
+    tracemalloc.start()
+
+    def clock(stage):
+        peaks[stage] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+    run_stages(graph, clock)
+    tracemalloc.stop()
+    return {
+        "name": name,
+        "family": family,
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "simplices": simplices,
+        "nonzeros": nnz,
+        "lambda": value,
+        "seconds": seconds,
+        "total_seconds": sum(seconds.values()),
+        "peak_bytes": peaks,
+        "max_peak_bytes": max(peaks.values()),
+    }
+
+
+def compare(report, baseline, threshold):
+    """Prints stage time ratios against the baseline; returns the list of
+    (case, stage, ratio) slower than `threshold`."""
+    old = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in report["cases"]:
+        before = old.get(case["name"])
+        if before is None:
+            continue
+        ratios = []
+        for stage in STAGES + ["total"]:
+            key = "total_seconds" if stage == "total" else None
+            new_time = case[key] if key else case["seconds"][stage]
+            old_time = before[key] if key else before["seconds"].get(stage)
+            if not old_time:
+                continue
+            ratio = new_time / old_time
+            ratios.append(f"{stage} {ratio:.2f}x")
+            # Stages of a few milliseconds are dominated by timer noise.
+            if stage != "total" and ratio > threshold and new_time > NOISE_SECONDS:
+                regressions.append((case["name"], stage, ratio))
+        if not np.isclose(case["lambda"], before["lambda"], rtol=1e-6):
+            print(f"{case['name']}: lambda changed from {before['lambda']} to {case['lambda']}")
+        print(f"{case['name']:>24}  " + ", ".join(ratios))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes only")
+    parser.add_argument("-k", "--filter", default="", help="only cases whose name contains this")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "machine": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": [],
+    }
+    print(f"{'case':>24} {'nodes':>6} {'simplices':>10} " + " ".join(f"{stage:>10}" for stage in STAGES) + f" {'peak MiB':>9}")
+    for name, family, make in cases(args.quick):
+        if args.filter not in name:
+            continue
+        case = measure(name, family, make(), args.repeat)
+        report["cases"].append(case)
+        print(f"{name:>24} {case['nodes']:>6} {case['simplices']:>10} "
+              + " ".join(f"{case['seconds'][stage] * 1000:>8.2f}ms" for stage in STAGES)
+              + f" {case['max_peak_bytes'] / 2**20:>9.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for name, stage, ratio in regressions:
+            print(f"REGRESSION: {name} {stage} {ratio:.2f}x slower")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
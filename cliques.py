@@ -0,0 +1,91 @@
+import numpy as np
+
+
+def iter_cliques(adjacency, conflicts=None, candidates=None, base=0):
+    """Yields every clique of a graph exactly once, as an integer bitmask.
+
+    `adjacency[v]` is the neighbour bitmask of vertex v. Cliques are grown in
+    increasing vertex order, so each one is produced exactly once and no
+    membership test is needed. Vertices whose bits are set in `conflicts[v]`
+    are never put in the same clique as v. If `base` is given, only the
+    proper supersets of `base` whose new vertices lie in `candidates` are
+    yielded.
+    """
+    if candidates is None:
+        candidates = (1 << len(adjacency)) - 1
+    stack = [(base, candidates)]
+    while stack:
+        clique, cand = stack.pop()
+        while cand:
+            low = cand & -cand
+            cand ^= low
+            v = low.bit_length() - 1
+            grown = clique | low
+            yield grown
+            rest = cand & adjacency[v]
+            if conflicts is not None:
+                rest &= ~conflicts[v]
+            if rest:
+                stack.append((grown, rest))
+
+
+def words_for(num_bits):
+    return max(1, (num_bits + 63) // 64)
+
+
+def pack_masks(masks, num_bits):
+    """Packs integer bitmasks into an (N, W) uint64 array, bit i of a mask
+    being bit i % 64 of word i // 64."""
+    width = words_for(num_bits)
+    nbytes = width * 8
+    buffer = b"".join(mask.to_bytes(nbytes, "little") for mask in masks)
+    return np.frombuffer(buffer, dtype="<u8").reshape(-1, width).astype(np.uint64)
+
+
+def mask_members(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def signed_clique_complex(adjacency):
+    """Simplices of the two point blow-up without building the blow-up.
+
+    A simplex of the blow-up is a clique of the base graph with a sign on
+    each vertex. Returns the packed base cliques, how many signed simplices
+    each of them expands to (2 ** size), and the packed positive and
+    negative parts of every simplex, grouped by base clique.
+    """
+    n = len(adjacency)
+    cliques = list(iter_cliques(adjacency))
+    positive = []
+    negative = []
+    for clique in cliques:
+        part = clique
+        while True:
+            positive.append(part)
+            negative.append(clique ^ part)
+            if not part:
+                break
+            part = (part - 1) & clique
+    repeats = np.array([1 << bin(clique).count("1") for clique in cliques], dtype=np.int64)
+    return pack_masks(cliques, n), repeats, pack_masks(positive, n), pack_masks(negative, n)
+
+
+def iter_maximal_cliques(adjacency):
+    """Yields the maximal cliques as bitmasks: Bron–Kerbosch with Tomita
+    pivoting, run on an explicit stack over bitmask candidate sets."""
+    stack = [(0, (1 << len(adjacency)) - 1, 0)]
+    while stack:
+        clique, candidates, excluded = stack.pop()
+        if not candidates:
+            if not excluded:
+                yield clique
+            continue
+        pivot = max(mask_members(candidates | excluded), key=lambda u: bin(candidates & adjacency[u]).count("1"))
+        for v in mask_members(candidates & ~adjacency[pivot]):
+            bit = 1 << v
+            stack.append((clique | bit, candidates & adjacency[v], excluded & adjacency[v]))
+            candidates &= ~bit
+            excluded |= bit
@@ -0,0 +1,254 @@
+import numpy as np
+
+from cliques import mask_members
+
+
+# Limits of `bounded_key`: at most this many vertices and KEY_WORK / n^2
+# search nodes, which keeps every key below a few tens of milliseconds.
+KEY_NODES = 24
+KEY_WORK = 10_000
+
+
+class CompactGraph:
+    """Integer-indexed simple graph.
+
+    Vertices are 0..n-1 and `labels[i]` is the original label of vertex i.
+    Adjacency is kept as CSR arrays (`indptr`, `indices`, neighbours sorted)
+    and, for the set algebra of the clique code, as one integer bitmask per
+    vertex. In the two point blow-up vertex i + n is the inverse of vertex i.
+    """
+
+    def __init__(self, labels, indptr, indices):
+        self.labels = list(labels)
+        self.n = len(self.labels)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self._masks = None
+        self._key = None
+        self._keyed = False
+
+    @classmethod
+    def from_edges(cls, labels, edges):
+        """Builds the graph from an (m, 2) array of vertex index pairs."""
+        n = len(labels)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        both = np.concatenate([edges, edges[:, ::-1]])
+        keys = np.unique(both[:, 0] * max(n, 1) + both[:, 1])
+        rows, cols = np.divmod(keys, max(n, 1))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(labels, indptr, cols)
+
+    @classmethod
+    def from_networkx(cls, graph):
+        labels = list(graph.nodes)
+        index = {label: i for i, label in enumerate(labels)}
+        edges = [(index[u], index[v]) for u, v in graph.edges]
+        return cls.from_edges(labels, edges)
+
+    def to_networkx(self):
+        import networkx as nx
+
+        graph = nx.Graph()
+        graph.add_nodes_from(self.labels)
+        graph.add_edges_from((self.labels[u], self.labels[v]) for u, v in self.edges().tolist())
+        return graph
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(range(self.n))
+
+    def __getitem__(self, v):
+        return self.neighbors(v)
+
+    def __getstate__(self):
+        return {"labels": self.labels, "indptr": self.indptr, "indices": self.indices}
+
+    def __setstate__(self, state):
+        self.__init__(state["labels"], state["indptr"], state["indices"])
+
+    def neighbors(self, v):
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def degree(self, v):
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def number_of_nodes(self):
+        return self.n
+
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def edges(self):
+        """(m, 2) array of the edges (u, v) with u < v."""
+        rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(self.indptr))
+        keep = rows < self.indices
+        return np.stack([rows[keep], self.indices[keep]], axis=1)
+
+    @property
+    def masks(self):
+        if self._masks is None:
+            self._masks = [sum(1 << int(u) for u in self.neighbors(v)) for v in range(self.n)]
+        return self._masks
+
+    @property
+    def key(self):
+        """`bounded_key` of the graph (None if too costly), computed once."""
+        if not self._keyed:
+            self._key = bounded_key(self.masks)
+            self._keyed = True
+        return self._key
+
+    def induced(self, vertices):
+        """Subgraph induced on `vertices`, renumbered 0..k-1 in the given order."""
+        vertices = np.asarray(vertices, dtype=np.int64)
+        position = np.full(self.n, -1, dtype=np.int64)
+        position[vertices] = np.arange(len(vertices))
+        counts = self.indptr[vertices + 1] - self.indptr[vertices]
+        rows = np.repeat(np.arange(len(vertices)), counts)
+        cols = position[np.concatenate([self.neighbors(v) for v in vertices.tolist()] or [np.zeros(0, dtype=np.int32)])]
+        keep = cols >= 0
+        edges = np.stack([rows[keep], cols[keep]], axis=1)
+        return CompactGraph.from_edges([self.labels[v] for v in vertices.tolist()], edges)
+
+    def star(self, v):
+        return self.induced(self.neighbors(v))
+
+
+def _refine(masks, cells):
+    # Equitable refinement: split cells by neighbour counts into every other
+    # cell until stable. Splits are ordered by count, so the result does not
+    # depend on the vertex numbering.
+    cells = [list(cell) for cell in cells]
+    i = 0
+    while i < len(cells):
+        splitter = 0
+        for v in cells[i]:
+            splitter |= 1 << v
+        refined = []
+        split = False
+        for cell in cells:
+            if len(cell) == 1:
+                refined.append(cell)
+                continue
+            groups = {}
+            for v in cell:
+                groups.setdefault(bin(masks[v] & splitter).count("1"), []).append(v)
+            if len(groups) > 1:
+                split = True
+            refined.extend(groups[count] for count in sorted(groups))
+        cells = refined
+        i = 0 if split else i + 1
+    return cells
+
+
+def _relabelled(masks, order):
+    position = {v: i for i, v in enumerate(order)}
+    code = []
+    for v in order:
+        mask = 0
+        for u in mask_members(masks[v]):
+            mask |= 1 << position[u]
+        code.append(mask)
+    return tuple(code)
+
+
+class SearchBudgetExceeded(Exception):
+    pass
+
+
+def canonical_labeling(masks, cells=None, budget=None):
+    """Canonical form of a small graph given as neighbour bitmasks.
+
+    Individualisation-refinement search that keeps the lexicographically
+    largest relabelled adjacency, pruning branches with the automorphisms
+    found on the way. `cells` is an optional ordered vertex colouring.
+    Returns (code, order): `code` is the tuple of neighbour masks after
+    relabelling vertex order[i] to i, and two graphs (with matching
+    colourings) are isomorphic iff their codes are equal. With a `budget`,
+    SearchBudgetExceeded is raised once the search visits more nodes.
+    """
+    n = len(masks)
+    if cells is None:
+        cells = [list(range(n))]
+    if n == 0:
+        return (), []
+    best = {}
+    automorphisms = []
+    visited = [0]
+
+    def orbit_of(v, fixed, tried):
+        # Union of the orbits of the tried vertices under the automorphisms
+        # found so far that fix the current path pointwise.
+        usable = [gamma for gamma in automorphisms if all(gamma[f] == f for f in fixed)]
+        orbit = set(tried)
+        grew = True
+        while grew:
+            grew = False
+            for gamma in usable:
+                for u in list(orbit):
+                    if gamma[u] not in orbit:
+                        orbit.add(gamma[u])
+                        grew = True
+        return v in orbit
+
+    def search(cells, fixed):
+        visited[0] += 1
+        if budget is not None and visited[0] > budget:
+            raise SearchBudgetExceeded
+        cells = _refine(masks, cells)
+        target = next((i for i, cell in enumerate(cells) if len(cell) > 1), None)
+        if target is None:
+            order = [cell[0] for cell in cells]
+            code = _relabelled(masks, order)
+            for leaf in ("first", "best"):
+                if leaf in best and best[leaf][0] == code:
+                    other = best[leaf][1]
+                    gamma = [0] * n
+                    for a, b in zip(order, other):
+                        gamma[a] = b
+                    automorphisms.append(gamma)
+                    return
+            if "first" not in best:
+                best["first"] = (code, order)
+            if "best" not in best or code > best["best"][0]:
+                best["best"] = (code, order)
+            return
+        tried = []
+        for v in cells[target]:
+            if tried and orbit_of(v, fixed, tried):
+                continue
+            tried.append(v)
+            rest = [u for u in cells[target] if u != v]
+            search(cells[:target] + [[v], rest] + cells[target + 1:], fixed + [v])
+
+    search(cells, [])
+    return best["best"]
+
+
+def canonical_key(masks):
+    """Canonical certificate string of a small graph (n:hex,hex,...)."""
+    code, _ = canonical_labeling(masks)
+    return f"{len(code)}:" + ",".join(format(mask, "x") for mask in code)
+
+
+def bounded_key(masks):
+    """`canonical_key` if it is cheap to find, else None.
+
+    Graphs with many automorphisms (complete, empty, complete bipartite,
+    blown-up graphs) need thousands of search nodes, each refining all n
+    vertices: K24 takes seconds while its neighbourhoods solve at once.
+    So the key is only computed up to KEY_NODES vertices and within
+    KEY_WORK / n^2 search nodes; a random graph needs a handful.
+    """
+    n = len(masks)
+    if n > KEY_NODES:
+        return None
+    try:
+        code, _ = canonical_labeling(masks, budget=max(1, KEY_WORK // (n * n or 1)))
+    except SearchBudgetExceeded:
+        return None
+    return f"{len(code)}:" + ",".join(format(mask, "x") for mask in code)
@@ -5,9 +5,10 @@ import networkx as nx
 from plot import * # Assuming this file contains plot_two_adjacency_matrices_diff_size
 from isjoin import * # Assuming this file contains is_join
 
-def sort_matrix(matrix):
-    """Sorts the matrix rows in ascending order based on the sum of each row."""
-    row_sums = np.sum(matrix, axis=1)
+def sort_matrix(matrix, weights=None):
+    """Sorts the matrix rows in ascending order based on the sum of each row,
+    or on `weights` (e.g. the Perron vector) if given."""
+    row_sums = np.sum(matrix, axis=1) if weights is None else np.asarray(weights)
     sorted_indices = np.argsort(row_sums)  # Indices that would sort the sums
     sorted_matrix = matrix[sorted_indices]  #Sort rows of the matrix by the indices
     return sorted_matrix
@@ -23,8 +24,9 @@ def pad_matrix(smaller_matrix, larger_size):
 
 
 
-def display_results(matrix1, matrix2, graph1, graph2):
-    """Displays adjacency matrices and graphs in a single figure."""
+def display_results(matrix1, matrix2, graph1, graph2, weights1=None, weights2=None):
+    """Displays adjacency matrices and graphs in a single figure. The rows
+    are sorted by `weights1`/`weights2` if given, else by row sums."""
 
     fig, axes = plt.subplots(3, 2, figsize=(12, 15))
 
@@ -35,7 +37,7 @@ def display_results(matrix1, matrix2, graph1, graph2):
     axes[0, 0].set_yticks(np.arange(matrix1.shape[0]))
 
     # Sorted Matrix 1
-    sorted_matrix1 = sort_matrix(matrix1)
+    sorted_matrix1 = sort_matrix(matrix1, weights1)
     axes[1, 0].imshow(sorted_matrix1, cmap='binary')
     axes[1, 0].set_title("Adjacency Matrix 1 (Sorted)")
     axes[1, 0].set_xticks(np.arange(sorted_matrix1.shape[1]))
@@ -54,7 +56,9 @@ def display_results(matrix1, matrix2, graph1, graph2):
 
     # Pad and Sort Matrix 2
     padded_matrix2 = pad_matrix(matrix2, matrix1.shape) #Pad to match size of matrix1
-    sorted_matrix2 = sort_matrix(padded_matrix2)
+    if weights2 is not None:
+        weights2 = np.pad(np.asarray(weights2), (0, padded_matrix2.shape[0] - len(weights2)))
+    sorted_matrix2 = sort_matrix(padded_matrix2, weights2)
     axes[1, 1].imshow(sorted_matrix2, cmap='binary')
     axes[1, 1].set_title("Adjacency Matrix 2 (Padded and Sorted)")
     axes[1, 1].set_xticks(np.arange(sorted_matrix2.shape[1]))
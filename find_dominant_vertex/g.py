@@ -1,3 +1,5 @@
+import os
+import sys
 import random
 import numpy as np
 from plot import *
@@ -5,74 +7,189 @@ from isjoin import *
 from display_matrix import *
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cliques import iter_cliques, iter_maximal_cliques, mask_members
+from transition import clique_move_matrix
+from spectral import perron_bounds, perron_vector, spectral_radius as perron_root
+from results import graph_key, results_db
 
-def powerset(s):
-    result = [[]]
-    for elem in s:
-        result.extend([x + [elem] for x in result])
-    return result
 
-def is_clique(graph, nodes):
-    return all(graph[u][v] for i, u in enumerate(nodes) for v in nodes[i + 1:])
+def iter_cliques_of(graph):
+    """Liefert nach und nach jede nicht-leere Clique als sortierte Knotenliste."""
+    for mask in iter_cliques(adjacency_masks(graph)):
+        yield list(mask_members(mask))
+
+def iter_maximal_cliques_of(graph):
+    for mask in iter_maximal_cliques(adjacency_masks(graph)):
+        yield list(mask_members(mask))
 
 def find_cliques(graph):
-    n = len(graph)
-    nodes = list(range(n))
-    max_cliques = []
-    for subset in powerset(nodes):
-        if is_clique(graph, subset):
-            if not any(set(subset) < set(c) for c in max_cliques):
-                max_cliques = [c for c in max_cliques if not set(c) < set(subset)]
-                max_cliques.append(subset)
-    return max_cliques
-
-def link(graph, v):
-    return {u for u, connected in enumerate(graph[v]) if connected}
-
-def clique_move(graph, alpha, beta):
-    # Gemeinsamer Link aller Knoten in alpha
-    common_link = set(range(len(graph)))
-    for v in alpha:
-        common_link &= link(graph, v)
-    # Neue Knoten in beta (die nicht in alpha waren)
-    new_nodes = set(beta) - set(alpha)
-    # Bedingung: Kein neuer Knoten liegt im gemeinsamen Link
-    return len(new_nodes & common_link) == 0
+    # nach Bitmaske sortiert: die Reihenfolge der früheren Potenzmengen-Suche
+    masks = sorted(iter_maximal_cliques(adjacency_masks(graph)))
+    return [list(mask_members(mask)) for mask in masks]
+
+def adjacency_masks(graph):
+    if isinstance(graph, np.ndarray):
+        packed = np.packbits(graph.astype(bool), axis=1, bitorder="little")
+        return [int.from_bytes(row.tobytes(), "little") for row in packed]
+    return [sum(1 << u for u, connected in enumerate(row) if connected) for row in graph]
 
 def build_good_matrix(graph, cliques):
-    n = len(cliques)
-    matrix = [[0]*n for _ in range(n)]
-    for i, alpha in enumerate(cliques):
-        for j, beta in enumerate(cliques):
-            if clique_move(graph, alpha, beta):
-                matrix[i][j] = 1
-    return matrix
+    masks = [sum(1 << v for v in clique) for clique in cliques]
+    return clique_move_matrix(adjacency_masks(graph), masks)
+
 
+def known_results(graph):
+    """(Schlüssel, bekannte Werte) des Graphen in der Ergebnisdatenbank. Der
+    Schlüssel ist None, wenn die Datenbank aus ist oder die kanonische Form
+    zu teuer wäre (siehe compact.bounded_key)."""
+    if results_db.path is None:
+        return None, {}
+    key = graph_key(adjacency_masks(graph))
+    return key, (results_db.get(key) if key is not None else None) or {}
 
-def spectral_radius(matrix) -> float:
+def spectral_radius(matrix, graph=None, known=None) -> float:
+    """Spektralradius der Good-Matrix. Ist `graph` angegeben, wird der Wert
+    zuerst in der Ergebnisdatenbank gesucht und danach dort abgelegt;
+    `known` ist ein schon geholtes Ergebnis von `known_results(graph)`."""
     matrix = np.array(matrix)
     if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
         raise ValueError("Die Eingabe muss eine quadratische 2D-Matrix sein.")
 
-    eigenwerte = np.linalg.eigvals(matrix)
-    return np.max(np.abs(eigenwerte))
+    if graph is None:
+        return perron_root(matrix)
+    key, values = known if known is not None else known_results(graph)
+    rho = values.get("rho")
+    if rho is None:
+        rho = perron_root(matrix)
+        if key is not None:
+            results_db.put(key, len(graph), rho=rho, cliques=matrix.shape[0])
+    return rho
+
+def perron_weights(matrix):
+    """(Spektralradius, Perron-Vektor) der Good-Matrix aus einer Lösung; der
+    Vektor gewichtet die Cliquen (Zeilen) und hat Summe 1."""
+    return perron_vector(np.array(matrix))
+
+def vertex_weights(graph, cliques, weights):
+    """Gewicht jedes Knotens: Summe der Perron-Gewichte der Cliquen, die ihn enthalten."""
+    result = np.zeros(len(graph))
+    for clique, weight in zip(cliques, weights):
+        result[clique] += weight
+    return result
+
+def dominant_vertices(graph, cliques=None):
+    """(Spektralradius, Knotengewichte, Cliquengewichte) mit einer einzigen
+    Eigenwertlösung; der dominante Knoten ist argmax der Knotengewichte."""
+    if cliques is None:
+        cliques = find_all_cliques(graph)
+    rho, weights = perron_weights(build_good_matrix(graph, cliques))
+    return rho, vertex_weights(graph, cliques, weights), weights
 
-def generate_random_graph(n, p):
+def generate_random_graph(n, p, rng=random):
     graph = [[0]*n for _ in range(n)]
     for i in range(n):
         for j in range(i+1, n):
-            if random.random() < p and i != j:
+            if rng.random() < p and i != j:
                 graph[i][j] = graph[j][i] = 1
     return graph
 
+def generate_random_graphs(count, n, p, rng=None):
+    """`count` Zufallsgraphen G(n, p) auf einmal, als (count, n, n) uint8-Array.
+
+    `p` ist eine Zahl oder ein Array mit einer Kantenwahrscheinlichkeit pro
+    Graph; `rng` ein np.random.Generator oder Seed.
+    """
+    rng = np.random.default_rng(rng)
+    p = np.broadcast_to(np.asarray(p, dtype=np.float64), (count,))
+    upper = np.triu_indices(n, 1)
+    graphs = np.zeros((count, n, n), dtype=np.uint8)
+    graphs[:, upper[0], upper[1]] = rng.random((count, len(upper[0]))) < p[:, None]
+    graphs |= graphs.transpose(0, 2, 1)
+    return graphs
+
+def packed_masks(graphs):
+    """Nachbarschaften eines (count, n, n)-Stapels als (count, n) uint64-Bitmasken (n <= 64)."""
+    count, n, _ = graphs.shape
+    if n > 64:
+        raise ValueError("Gepackte Masken gibt es nur bis n = 64.")
+    weights = np.uint64(1) << np.arange(n, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.where(graphs.astype(bool), weights, np.uint64(0)), axis=2)
+
+def _connected(masks):
+    # Breitensuche ab Knoten 0 für alle Graphen gleichzeitig
+    count, n = masks.shape
+    if n <= 1:
+        return np.ones(count, dtype=bool)
+    full = np.uint64((1 << n) - 1)
+    reach = np.ones(count, dtype=np.uint64)
+    while True:
+        grown = reach.copy()
+        for v in range(n):
+            inside = ((grown >> np.uint64(v)) & np.uint64(1)).astype(bool)
+            grown |= np.where(inside, masks[:, v], np.uint64(0))
+        if np.array_equal(grown, reach):
+            return reach == full
+        reach = grown
+
+def connected_graphs(graphs):
+    return _connected(packed_masks(graphs))
+
+def non_join_graphs(graphs):
+    """Wie `not is_join(g)` für jeden Graphen: das Komplement ist zusammenhängend."""
+    masks = packed_masks(graphs)
+    n = masks.shape[1]
+    full = np.uint64((1 << n) - 1)
+    self_bits = np.uint64(1) << np.arange(n, dtype=np.uint64)
+    return _connected(~masks & full & ~self_bits)
+
+def clique_counts_at_least(graphs, minimum):
+    """Ob jeder Graph mindestens `minimum` nicht-leere Cliquen hat. Knoten,
+    Kanten und Dreiecke sind eine untere Schranke; nur Graphen darunter
+    werden einzeln aufgezählt."""
+    a = graphs.astype(np.int32)
+    n = graphs.shape[1]
+    edges = a.sum(axis=(1, 2)) // 2
+    triangles = ((a @ a) * a).sum(axis=(1, 2)) // 6
+    result = n + edges + triangles >= minimum
+    for i in np.flatnonzero(~result):
+        result[i] = sum(1 for _ in iter_cliques(adjacency_masks(graphs[i]))) >= minimum
+    return result
+
+def filter_graphs(graphs, connected=False, non_join=False, min_cliques=None):
+    """Boolesche Maske der Graphen eines Stapels, die alle Filter erfüllen."""
+    keep = np.ones(len(graphs), dtype=bool)
+    if connected:
+        keep &= connected_graphs(graphs)
+    if non_join:
+        keep &= non_join_graphs(graphs)
+    if min_cliques is not None:
+        keep[keep] &= clique_counts_at_least(graphs[keep], min_cliques)
+    return keep
+
+def sample_pairs(count, rng, non_join=True, **filters):
+    """`count` Paare wie `sample_pair` auf einmal aus einem np.random.Generator.
+    Gibt (Index, g1, g2) für die Paare zurück, bei denen beide Graphen die
+    Filter von `filter_graphs` erfüllen (standardmäßig: kein Join, wie in
+    `meet_condition`)."""
+    small = rng.integers(1, 16, count)
+    large = small + rng.integers(2, 4, count)
+    p1 = rng.random(count)
+    p2 = rng.random(count)
+    graphs = {}
+    keep = np.ones(count, dtype=bool)
+    for sizes, ps, side in ((large, p1, 0), (small, p2, 1)):
+        for n in np.unique(sizes):
+            index = np.flatnonzero(sizes == n)
+            batch = generate_random_graphs(len(index), int(n), ps[index], rng)
+            keep[index] &= filter_graphs(batch, non_join=non_join, **filters)
+            for i, graph in zip(index.tolist(), batch):
+                graphs[i, side] = graph
+    return [(i, graphs[i, 0], graphs[i, 1]) for i in np.flatnonzero(keep).tolist()]
+
 def find_all_cliques(graph):
-    n = len(graph)
-    nodes = list(range(n))
-    all_cliques = []
-    for subset in powerset(nodes):
-        if len(subset) >= 1 and is_clique(graph, subset):
-            all_cliques.append(subset)
-    return all_cliques
+    masks = sorted(iter_cliques(adjacency_masks(graph)))
+    return [list(mask_members(mask)) for mask in masks]
 
 def convert_to_nx_graph(graph):
     arr = np.array(graph)
@@ -81,7 +198,7 @@ def convert_to_nx_graph(graph):
 
 
 def meet_condition(g1, g2):
-    if (not g1 or not g2):
+    if (len(g1) == 0 or len(g2) == 0):
         print(g1)
         return False
 
@@ -91,14 +208,13 @@ def meet_condition(g1, g2):
     # except nx.NetworkXNoCycle:
     #     return False
 
-    g1 = convert_to_nx_graph(g1)
-    g2 = convert_to_nx_graph(g2)
     # g1_connected = nx.is_connected(g1)
     # g2_connected = nx.is_connected(g2)
     # if(not g1_connected or not g2_connected):
     #     return False
 
-    g1join = is_join(g1) 
+    # is_join arbeitet direkt auf den Adjazenzmatrizen
+    g1join = is_join(g1)
     g2join = is_join(g2)
 
     if(g1join or g2join):
@@ -107,31 +223,76 @@ def meet_condition(g1, g2):
     return True
 
 
+def sample_pair(rng=random):
+    random_integer = rng.randint(1, 15)
+    random_increase = rng.randint(2, 3)
+    g1 = generate_random_graph(random_integer + random_increase, rng.random(), rng)
+    g2 = generate_random_graph(random_integer, rng.random(), rng)
+    return g1, g2
+
+def evaluate_pair(g1, g2, prune=False, stats=None, weights=False):
+    """None, wenn (g1, g2) kein Kandidat ist, sonst (cliques1, cliques2,
+    matrix1, matrix2, rho1, rho2).
+
+    Beide Graphen werden zuerst in der Ergebnisdatenbank gesucht: bekannte
+    Cliquenzahlen können das Paar sofort verwerfen, bekannte Radien sparen
+    Schranken und Eigenwertlösungen.
+
+    Mit `weights` werden die Perron-Vektoren beider Matrizen angehängt, aus
+    denselben Lösungen wie die Radien (ohne Ergebnisdatenbank).
+
+    Mit `prune` werden die Radien zuerst durch `perron_bounds` eingegrenzt;
+    zeigen die Schranken schon rho1 >= rho2, entfallen die Eigenwertlösungen
+    und die Radien (und Perron-Vektoren) sind None. `stats` (ein dict) zählt
+    "pruned" und "solved".
+    """
+    known1 = known_results(g1) if not weights else (None, {})
+    known2 = known_results(g2) if not weights else (None, {})
+    if "cliques" in known1[1] and "cliques" in known2[1] and known1[1]["cliques"] <= known2[1]["cliques"]:
+        return None
+    cliques1 = find_all_cliques(g1)
+    cliques2 = find_all_cliques(g2)
+
+    if len(cliques1) > len(cliques2) and meet_condition(g1, g2):
+        matrix1 = build_good_matrix(g1, cliques1)
+        matrix2 = build_good_matrix(g2, cliques2)
+        if "rho" in known1[1] and "rho" in known2[1]:
+            return cliques1, cliques2, matrix1, matrix2, known1[1]["rho"], known2[1]["rho"]
+        if prune:
+            lower1, _ = perron_bounds(matrix1)
+            _, upper2 = perron_bounds(matrix2)
+            if lower1 >= upper2:
+                if stats is not None:
+                    stats["pruned"] = stats.get("pruned", 0) + 1
+                if weights:
+                    return cliques1, cliques2, matrix1, matrix2, None, None, None, None
+                return cliques1, cliques2, matrix1, matrix2, None, None
+        if stats is not None:
+            stats["solved"] = stats.get("solved", 0) + 1
+        if weights:
+            rho1, weights1 = perron_weights(matrix1)
+            rho2, weights2 = perron_weights(matrix2)
+            return cliques1, cliques2, matrix1, matrix2, rho1, rho2, weights1, weights2
+        return cliques1, cliques2, matrix1, matrix2, spectral_radius(matrix1, g1, known1), spectral_radius(matrix2, g2, known2)
+    return None
+
+
 def main():
-    count = 0
-    num_graphs_per_update = 1000
     while True:
-        count += 1
-        random_integer = random.randint(1, 15)
-        random_increase = random.randint(2, 3)
-        g1 = generate_random_graph(random_integer + random_increase, random.random())  #Fixed the graph size to 6
-        g2 = generate_random_graph(random_integer, random.random())
-
-        cliques1 = find_all_cliques(g1)
-        cliques2 = find_all_cliques(g2)
-
-        if len(cliques1) > len(cliques2) and meet_condition(g1, g2):
-            matrix1 = build_good_matrix(g1, cliques1)
-            matrix2 = build_good_matrix(g2, cliques2)
-            rho1 = spectral_radius(matrix1)
-            rho2 = spectral_radius(matrix2)
-            print(f"Graph 1: {len(cliques1)} Cliques, {random_integer + random_increase} nodes , Spektralradius = {rho1:.4f}")
-            print(f"Graph 2: {len(cliques2)} Cliques, {random_integer} nodes Spektralradius = {rho2:.4f}")
+        g1, g2 = sample_pair()
+        candidate = evaluate_pair(g1, g2, weights=True)
+
+        if candidate is not None:
+            cliques1, cliques2, matrix1, matrix2, rho1, rho2, weights1, weights2 = candidate
+            dominant1 = int(np.argmax(vertex_weights(g1, cliques1, weights1)))
+            dominant2 = int(np.argmax(vertex_weights(g2, cliques2, weights2)))
+            print(f"Graph 1: {len(cliques1)} Cliques, {len(g1)} nodes , Spektralradius = {rho1:.4f}, dominanter Knoten {dominant1}")
+            print(f"Graph 2: {len(cliques2)} Cliques, {len(g2)} nodes Spektralradius = {rho2:.4f}, dominanter Knoten {dominant2}")
             
             graph1_nx = convert_to_nx_graph(g1)  # Convert to NetworkX graph for plotting
             graph2_nx = convert_to_nx_graph(g2)
 
-            display_results(np.array(matrix1), np.array(matrix2), graph1_nx, graph2_nx)
+            display_results(np.array(matrix1), np.array(matrix2), graph1_nx, graph2_nx, weights1, weights2)
 
             if rho1 >= rho2:
                 print("graph good")
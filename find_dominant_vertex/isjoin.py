@@ -1,6 +1,17 @@
 import networkx as nx
+import numpy as np
 
-def is_join(G: nx.Graph) -> bool:
+
+def adjacency_bitmasks(G):
+    """Nachbarschaften als Bitmasken, für einen nx.Graph oder eine
+    Adjazenzmatrix (Liste von Listen oder np.ndarray)."""
+    if isinstance(G, nx.Graph):
+        index = {node: i for i, node in enumerate(G.nodes)}
+        return [sum(1 << index[u] for u in G.adj[v] if u != v) for v in G.nodes]
+    return [sum(1 << int(u) for u in np.flatnonzero(row) if u != v) for v, row in enumerate(G)]
+
+
+def is_join(G) -> bool:
     """
     Prüft, ob der Graph G ein Join zweier nicht-leerer Teilgraphen ist,
     basierend auf der Zerlegung des Komplementärgraphen.
@@ -8,43 +19,39 @@ def is_join(G: nx.Graph) -> bool:
     Ein Graph G ist Join, wenn der Komplementärgraph von G nicht zusammenhängend ist
     und mindestens zwei Komponenten hat, die zusammen alle Knoten von G abdecken.
 
+    Der Komplementärgraph wird nicht aufgebaut: eine Breitensuche läuft über
+    die Nicht-Nachbarn, wobei die noch unbesuchten Knoten als Bitmaske
+    gehalten werden. Jeder Knoten wird genau einmal besucht, jeder Schritt
+    kostet O(n / 64) Wortoperationen.
+
     Parameter:
     -----------
-    G : nx.Graph
-        Ein ungerichteter Graph.
+    G : nx.Graph oder Adjazenzmatrix
+        Ein ungerichteter Graph, auch als 0/1-Matrix wie in g.py.
 
     Rückgabe:
     ----------
     bool
         True, wenn G ein Join ist, sonst False.
     """
-
-    n = G.number_of_nodes()
+    masks = adjacency_bitmasks(G)
+    n = len(masks)
     if n < 2:
         # Mindestens zwei Knoten nötig
         return False
 
-    # Komplementärgraph erzeugen
-    G_comp = nx.complement(G)
-
-    # Komponenten im Komplementärgraphen finden
-    components = list(nx.connected_components(G_comp))
-
-    if len(components) < 2:
-        # Weniger als zwei Komponenten: Komplementärgraph zusammenhängend -> kein Join
-        return False
-
-    # Prüfe, ob keine Komponente leer ist und die Komponenten zusammen alle Knoten abdecken
-    total_nodes = set()
-    for comp in components:
-        if len(comp) == 0:
-            return False
-        total_nodes.update(comp)
-
-    # Sicherheitshalber prüfen, ob alle Knoten in Komponenten enthalten sind
-    if total_nodes != set(G.nodes):
-        return False
-
-    # Mindestens zwei nicht-leere Komponenten, die alle Knoten abdecken -> Join
-    return True
-
+    # Erste Komponente des Komplementärgraphen ab Knoten 0 suchen
+    unvisited = (1 << n) - 2
+    stack = [0]
+    while stack and unvisited:
+        v = stack.pop()
+        non_neighbors = unvisited & ~masks[v]
+        unvisited &= masks[v]
+        while non_neighbors:
+            low = non_neighbors & -non_neighbors
+            non_neighbors ^= low
+            stack.append(low.bit_length() - 1)
+
+    # Bleiben Knoten übrig, hat das Komplement mindestens zwei nicht-leere
+    # Komponenten, die zusammen alle Knoten abdecken -> Join
+    return unvisited != 0
@@ -0,0 +1,191 @@
+"""Exhaustive version of the search in g.py: every graph up to N vertices,
+each isomorphism class exactly once.
+
+    python orderly.py generate 8 --index index/ [--shards 4 --shard 0]
+    python orderly.py check --index index/
+
+Graphs are produced by canonical augmentation: a child G + v of a canonical
+parent G is kept only if v lies in the orbit of the vertex the canonical
+labelling of G + v puts last, so every class has exactly one parent. Each
+graph's good-matrix spectral radius is computed once and appended to a
+per-shard JSONL index keyed by its canonical form. Shard i of k handles the
+parents whose position in their level is i mod k; a "done" record is written
+after each parent, so an interrupted run resumes where it stopped. "check"
+merges all shards and tests the monotonicity condition of g.py over every
+pair (G1, G2) of non-join graphs with more cliques in G1 than in G2 and, as
+in g.py, 2 or 3 more vertices (--increase, or --any-size for all pairs).
+"""
+import argparse
+import bisect
+import glob
+import json
+import os
+
+from g import build_good_matrix, find_all_cliques, spectral_radius
+from isjoin import is_join
+# the parent directory is on sys.path since importing g
+from compact import canonical_labeling
+
+
+def code_key(code):
+    return f"{len(code)}:" + ",".join(format(mask, "x") for mask in code)
+
+
+def augmentations(parent):
+    """Canonical children of a canonical graph (a tuple of neighbour masks)."""
+    n = len(parent)
+    seen = set()
+    for subset in range(1 << n):
+        child = [mask | (((subset >> v) & 1) << n) for v, mask in enumerate(parent)] + [subset]
+        # The canonical labelling puts a vertex of maximum degree last.
+        degree = bin(subset).count("1")
+        if any(bin(mask).count("1") > degree for mask in child):
+            continue
+        code, order = canonical_labeling(child)
+        last = order[-1]
+        if last != n:
+            new_last = canonical_labeling(child, [list(range(n)), [n]])[0]
+            canonical_last = canonical_labeling(child, [[v for v in range(n + 1) if v != last], [last]])[0]
+            if new_last != canonical_last:
+                continue
+        if code not in seen:
+            seen.add(code)
+            yield code
+
+
+def to_matrix(code):
+    n = len(code)
+    return [[(mask >> j) & 1 for j in range(n)] for mask in code]
+
+
+def analyse(code):
+    graph = to_matrix(code)
+    cliques = find_all_cliques(graph)
+    return {
+        "key": code_key(code),
+        "n": len(code),
+        "cliques": len(cliques),
+        # the shard files are the store here, so the results database is left out
+        "rho": float(spectral_radius(build_good_matrix(graph, cliques))),
+        "join": is_join(graph),
+    }
+
+
+def shard_path(index, shard, shards):
+    return os.path.join(index, f"shard-{shard}-of-{shards}.jsonl")
+
+
+def read_records(path):
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # the last line of an interrupted run may be cut off
+                continue
+
+
+def generate(max_n, index, shards=1, shard=0):
+    os.makedirs(index, exist_ok=True)
+    path = shard_path(index, shard, shards)
+    done = set()
+    if os.path.exists(path):
+        done = {tuple(record["done"]) for record in read_records(path) if "done" in record}
+    written = 0
+    with open(path, "a") as out:
+        level = [()]
+        for n in range(1, max_n + 1):
+            children = []
+            for p, parent in enumerate(level):
+                mine = p % shards == shard
+                if n == max_n and not mine:
+                    continue
+                kids = list(augmentations(parent))
+                children.extend(kids)
+                if mine and (n, p) not in done:
+                    for child in kids:
+                        out.write(json.dumps(analyse(child)) + "\n")
+                    out.write(json.dumps({"done": [n, p]}) + "\n")
+                    out.flush()
+                    written += len(kids)
+            print(f"n = {n}: {len(children)} graphs" + (" (this shard)" if n == max_n and shards > 1 else ""))
+            level = children
+    return written
+
+
+def load_index(index):
+    entries = {}
+    for path in glob.glob(os.path.join(index, "shard-*.jsonl")):
+        for record in read_records(path):
+            if "key" in record:
+                entries[record["key"]] = record
+    return entries
+
+
+INCREASES = (2, 3)
+
+
+def _best_below(pool):
+    # Pool sorted by clique count, and for every prefix its entry of largest
+    # radius: the strongest G2 with fewer cliques is a bisection away.
+    pool = sorted(pool, key=lambda e: e["cliques"])
+    best = []
+    for entry in pool:
+        best.append(entry if not best or entry["rho"] > best[-1]["rho"] else best[-1])
+    return [e["cliques"] for e in pool], best
+
+
+def check(index, tolerance=1e-9, increases=INCREASES):
+    """Pairs violating rho(G1) >= rho(G2) for cliques(G1) > cliques(G2),
+    both graphs non-empty and not joins, and G1 with n(G2) + d vertices for
+    some d in `increases` (as sample_pair in g.py draws them; None allows
+    any sizes). Returns (entries, violations), each violation being (G1, G2)
+    with G2 of largest radius."""
+    entries = [e for e in load_index(index).values() if e["n"] > 0 and not e["join"]]
+    by_size = {}
+    for entry in entries:
+        by_size.setdefault(entry["n"], []).append(entry)
+    pools = {}
+    violations = []
+    for entry in sorted(entries, key=lambda e: (e["n"], e["cliques"])):
+        sizes = tuple(entry["n"] - d for d in increases) if increases is not None else None
+        if sizes not in pools:
+            pools[sizes] = _best_below(
+                entries if sizes is None else [e for n in sizes for e in by_size.get(n, [])]
+            )
+        counts, best = pools[sizes]
+        k = bisect.bisect_left(counts, entry["cliques"]) - 1
+        if k >= 0 and entry["rho"] < best[k]["rho"] * (1 - tolerance):
+            violations.append((entry, best[k]))
+    return entries, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser("generate")
+    gen.add_argument("n", type=int)
+    gen.add_argument("--index", default="index")
+    gen.add_argument("--shards", type=int, default=1)
+    gen.add_argument("--shard", type=int, default=0)
+    chk = commands.add_parser("check")
+    chk.add_argument("--index", default="index")
+    chk.add_argument("--tolerance", type=float, default=1e-9)
+    chk.add_argument("--increase", type=int, nargs="+", default=list(INCREASES),
+                     help="allowed n(G1) - n(G2), as in g.py (default: 2 3)")
+    chk.add_argument("--any-size", action="store_true", help="compare graphs of all sizes")
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.n, args.index, args.shards, args.shard)
+    else:
+        increases = None if args.any_size else tuple(args.increase)
+        entries, violations = check(args.index, args.tolerance, increases)
+        rule = "any sizes" if increases is None else "n(G1) - n(G2) in {" + ", ".join(map(str, increases)) + "}"
+        print(f"{len(entries)} non-join graphs, {len(violations)} violations ({rule})")
+        for g1, g2 in violations[:10]:
+            print(f"COUNTEREXAMPLE: {g1['key']} ({g1['cliques']} cliques, rho {g1['rho']:.6f}) "
+                  f"< {g2['key']} ({g2['cliques']} cliques, rho {g2['rho']:.6f})")
+
+
+if __name__ == "__main__":
+    main()
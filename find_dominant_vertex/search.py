@@ -0,0 +1,142 @@
+"""Headless parallel search for a counterexample to the monotonicity of the
+good-matrix spectral radius.
+
+    python search.py --workers 8 --seed 1 --output counterexample.npz
+
+Worker k draws its pairs in batches of BATCH from a NumPy Generator on the
+k-th child of the seed's SeedSequence, so a run is reproducible given --seed
+and --workers. Pairs with a join graph are dropped in bulk before any clique
+or eigenvalue work. The first worker to find
+a counterexample stops all others; it is written to --output together with
+both adjacency and good matrices. Pass --show to plot it afterwards.
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+
+from g import evaluate_pair, sample_pairs
+
+BATCH = 256
+
+
+def worker_rng(seed, worker, workers):
+    return np.random.default_rng(np.random.SeedSequence(seed).spawn(workers)[worker])
+
+
+def replay(seed, worker, workers, batch, index):
+    """Regenerates pair `index` of the `batch`-th batch a worker drew."""
+    rng = worker_rng(seed, worker, workers)
+    for _ in range(batch):
+        sample_pairs(BATCH, rng)
+    for i, g1, g2 in sample_pairs(BATCH, rng, non_join=False):
+        if i == index:
+            return g1, g2
+
+
+def search_worker(worker, workers, seed, stop, tested, candidates, pruned, found):
+    rng = worker_rng(seed, worker, workers)
+    batch = 0
+    hits = 0
+    stats = {}
+    while not stop.is_set():
+        for index, g1, g2 in sample_pairs(BATCH, rng):
+            result = evaluate_pair(g1, g2, prune=True, stats=stats)
+            if result is not None:
+                hits += 1
+                _, _, matrix1, matrix2, rho1, rho2 = result
+                if rho1 is not None and rho1 < rho2:
+                    found.put({
+                        "g1": g1, "g2": g2,
+                        "matrix1": np.array(matrix1), "matrix2": np.array(matrix2),
+                        "rho1": rho1, "rho2": rho2,
+                        "seed": seed, "worker": worker, "workers": workers, "batch": batch, "index": index,
+                    })
+                    stop.set()
+            if stop.is_set():
+                break
+        batch += 1
+        tested[worker] = batch * BATCH
+        candidates[worker] = hits
+        pruned[worker] = stats.get("pruned", 0)
+
+
+def search(workers=None, seed=0, output="counterexample.npz", seconds=None, report_every=5.0):
+    """Runs the search until a counterexample is found (returned as a dict
+    and saved to `output`) or `seconds` have passed (returns None)."""
+    workers = workers or mp.cpu_count()
+    stop = mp.Event()
+    tested = mp.Array("q", workers)
+    candidates = mp.Array("q", workers)
+    pruned = mp.Array("q", workers)
+    found = mp.Queue()
+    processes = [
+        mp.Process(target=search_worker, args=(k, workers, seed, stop, tested, candidates, pruned, found), daemon=True)
+        for k in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start = time.time()
+    counterexample = None
+    try:
+        while counterexample is None:
+            try:
+                counterexample = found.get(timeout=report_every)
+            except queue.Empty:
+                pass
+            elapsed = time.time() - start
+            pairs = sum(tested)
+            hits = sum(candidates)
+            skipped = sum(pruned)
+            print(f"{elapsed:8.1f}s  {pairs} pairs ({pairs / elapsed:.1f}/s), {hits} candidates, "
+                  f"{skipped} decided by bounds ({100 * skipped / max(hits, 1):.0f}%)")
+            if seconds is not None and elapsed >= seconds:
+                break
+    finally:
+        stop.set()
+        # A second worker may have queued a counterexample too; its feeder
+        # thread keeps the process alive until the item is read.
+        deadline = time.time() + 10
+        for process in processes:
+            while process.is_alive() and time.time() < deadline:
+                try:
+                    found.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            process.join(timeout=max(0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+    if counterexample is not None:
+        np.savez(output, **counterexample)
+        print(f"COUNTEREXAMPLE (worker {counterexample['worker']}, batch {counterexample['batch']}, pair {counterexample['index']}): "
+              f"rho1 = {counterexample['rho1']:.4f} < rho2 = {counterexample['rho2']:.4f}, saved to {output}")
+    return counterexample
+
+
+def show(counterexample):
+    from display_matrix import display_results
+    from g import convert_to_nx_graph
+    from plot import plot_two_adjacency_matrices_diff_size
+
+    g1, g2 = counterexample["g1"], counterexample["g2"]
+    display_results(counterexample["matrix1"], counterexample["matrix2"], convert_to_nx_graph(g1), convert_to_nx_graph(g2))
+    plot_two_adjacency_matrices_diff_size(g1, g2, layout_k=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="counterexample.npz")
+    parser.add_argument("-t", "--seconds", type=float, default=None, help="give up after this long")
+    parser.add_argument("--show", action="store_true", help="plot the counterexample when one is found")
+    args = parser.parse_args()
+    counterexample = search(args.workers, args.seed, args.output, args.seconds)
+    if counterexample is not None and args.show:
+        show(counterexample)
+
+
+if __name__ == "__main__":
+    main()
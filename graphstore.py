@@ -0,0 +1,119 @@
+import json
+import pickle
+import struct
+
+import networkx as nx
+import numpy as np
+
+from compact import CompactGraph
+
+# File layout (little endian):
+#   magic b"EGGB", uint32 format version, uint64 header length,
+#   UTF-8 JSON header, zero padding to a 64 byte boundary,
+#   then the raw arrays listed in header["arrays"], each 64 byte aligned.
+# The header holds the label table, optional cached results and the dtype,
+# shape and offset of every array, so np.memmap can open them in place.
+MAGIC = b"EGGB"
+VERSION = 1
+ALIGN = 64
+EXTENSION = ".gbin"
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_graph(path, graph, results=None):
+    """Writes a networkx graph or CompactGraph. `results` may carry cached
+    invariants such as {"lambda": ..., "mu1": ..., "mu2": ...}."""
+    node_data = {}
+    if isinstance(graph, nx.Graph):
+        compact = CompactGraph.from_networkx(graph)
+        index = {label: i for i, label in enumerate(compact.labels)}
+        for label, data in graph.nodes(data=True):
+            if "blowup" in data:
+                node_data[index[label]] = {"blowup": data["blowup"], "inverse_of": index.get(data.get("inverse_of"))}
+    else:
+        compact = graph
+    for label in compact.labels:
+        if not isinstance(label, (str, int, float)):
+            raise TypeError(f"Graph store labels must be strings or numbers, got {label!r}")
+    arrays = {
+        "edges": compact.edges().astype(np.int32),
+        "indptr": compact.indptr.astype(np.int64),
+        "indices": compact.indices.astype(np.int32),
+    }
+    header = {
+        "labels": compact.labels,
+        "node_data": node_data,
+        "results": results or {},
+        "arrays": {},
+    }
+    # Array offsets depend on the header length and vice versa; grow the
+    # reserved header space until both agree.
+    start = 0
+    while True:
+        offset = start
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _aligned(offset + array.nbytes)
+        encoded = json.dumps(header).encode()
+        if _aligned(16 + len(encoded)) <= start:
+            break
+        start = _aligned(16 + len(encoded))
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<IQ", VERSION, len(encoded)) + encoded)
+        for name, array in arrays.items():
+            f.seek(header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a graph store file")
+        version, length = struct.unpack("<IQ", f.read(12))
+        if version > VERSION:
+            raise ValueError(f"{path} has format version {version}, newest supported is {VERSION}")
+        return json.loads(f.read(length))
+
+
+def load_array(path, header, name, mmap=True):
+    spec = header["arrays"][name]
+    shape = tuple(spec["shape"])
+    if mmap and int(np.prod(shape)) > 0:
+        return np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r", offset=spec["offset"], shape=shape)
+    with open(path, "rb") as f:
+        f.seek(spec["offset"])
+        return np.fromfile(f, dtype=np.dtype(spec["dtype"]), count=int(np.prod(shape))).reshape(shape)
+
+
+def load_compact(path, mmap=True):
+    """Opens a store as a CompactGraph whose CSR arrays are memory-mapped.
+    Returns the graph and the cached results."""
+    header = read_header(path)
+    graph = CompactGraph(header["labels"], load_array(path, header, "indptr", mmap), load_array(path, header, "indices", mmap))
+    return graph, header["results"]
+
+
+def is_graph_store(path):
+    with open(path, "rb") as f:
+        return f.read(4) == MAGIC
+
+
+def load_graph(path):
+    """Reads a graph store, or a legacy pickled nx.Graph (only load pickles
+    you trust). Returns the networkx graph and the cached results."""
+    if not is_graph_store(path):
+        with open(path, "rb") as f:
+            return pickle.load(f), {}
+    header = read_header(path)
+    labels = header["labels"]
+    graph = nx.Graph()
+    graph.add_nodes_from(labels)
+    graph.add_edges_from((labels[u], labels[v]) for u, v in load_array(path, header, "edges", mmap=False).tolist())
+    for i, data in header["node_data"].items():
+        inverse_of = data["inverse_of"]
+        graph.nodes[labels[int(i)]].update(blowup=data["blowup"], inverse_of=None if inverse_of is None else labels[inverse_of])
+    return graph, header["results"]
@@ -0,0 +1,181 @@
+import networkx as nx
+
+from cliques import iter_cliques, pack_masks
+from compact import CompactGraph
+from logic import star_eigenvalue, vertex_mu2
+from spectral import spectral_radius
+from transition import forbidden_sets, transition_csr
+
+
+class IncrementalAnalysis:
+    """Keeps λ, μ1 and μ2 of a graph up to date under single edits.
+
+    Every vertex gets a slot k; in the two point blow-up it is bit 2k and its
+    inverse bit 2k + 1. The simplices of the blow-up are kept as a set of
+    bitmasks and patched on every edit. Per-vertex star results are dropped
+    only for the vertices an edit can reach, so "Calculate" after a small
+    change re-solves a handful of stars instead of all of them.
+    """
+
+    def __init__(self, graph=None):
+        self.graph = graph if graph is not None else nx.Graph()
+        self.slots = {}
+        self.adjacency = []
+        self.conflicts = []
+        self.simplices = set()
+        self.star_values = {}
+        self.mu2_values = {}
+        self.eig = None
+        self.cached = {}
+        for node in self.graph:
+            self._add_slot(node)
+        for u, v in self.graph.edges:
+            self._set_adjacent(u, v, True)
+        self.simplices = set(iter_cliques(self.adjacency, self.conflicts))
+
+    def add_node(self, node):
+        self.graph.add_node(node)
+        self._add_slot(node)
+        self._changed()
+
+    def remove_node(self, node):
+        neighbors = list(self.graph[node])
+        self._forget(set(neighbors) | {node})
+        for other in neighbors:
+            self._set_adjacent(node, other, False)
+        self.graph.remove_node(node)
+        bits = self._bits(node)
+        self.simplices = {s for s in self.simplices if not s & bits}
+        del self.slots[node]
+        self._changed()
+
+    def add_edge(self, u, v):
+        for node in (u, v):
+            if node not in self.graph:
+                self.add_node(node)
+        self.graph.add_edge(u, v)
+        self._link(u, v)
+        self._forget(self._star_changes(u, v))
+        self._changed()
+
+    def remove_edge(self, u, v):
+        self._forget(self._star_changes(u, v))
+        self.graph.remove_edge(u, v)
+        self._set_adjacent(u, v, False)
+        bits_u, bits_v = self._bits(u), self._bits(v)
+        self.simplices = {s for s in self.simplices if not (s & bits_u and s & bits_v)}
+        self._changed()
+
+    def restore(self, results):
+        """Takes λ, μ1 and μ2 known for the current graph (e.g. stored with
+        it in a file) as results; they are dropped on the next edit."""
+        self.eig = results.get("lambda", self.eig)
+        self.cached = {name: results[name] for name in ("mu1", "mu2") if name in results}
+
+    def _changed(self):
+        self.eig = None
+        self.cached = {}
+
+    def eigenvalue(self, progress=None):
+        """λ of the graph. `progress(done, total, None)` is called after each
+        row block of the transition matrix; the eigen solve itself runs
+        uninterrupted. If `progress` raises, nothing is kept."""
+        if self.eig is None:
+            eig = 0
+            # The patched simplices are solved directly: a canonical-form
+            # lookup of the whole graph after every edit costs more.
+            if self.graph.size() != 0:
+                num_bits = len(self.adjacency)
+                simplices = pack_masks(sorted(self.simplices), num_bits)
+                forbidden = forbidden_sets(simplices, pack_masks(self.adjacency, num_bits), pack_masks(self.conflicts, num_bits))
+                report = None if progress is None else lambda done, total: progress(done, total, None)
+                eig = spectral_radius(transition_csr(simplices, forbidden, progress=report))
+            self.eig = eig
+        return self.eig
+
+    def mu1(self, progress=None):
+        if "mu1" in self.cached:
+            return self.cached["mu1"]
+        return self._vertex_max(self.star_values, star_eigenvalue, progress)
+
+    def mu2(self, progress=None):
+        # Per-vertex values are kept across edits, so they must be exact:
+        # no `best` is passed to vertex_mu2.
+        if "mu2" in self.cached:
+            return self.cached["mu2"]
+        def value(compact, v):
+            node = compact.labels[v]
+            if node not in self.star_values:
+                self.star_values[node] = star_eigenvalue(compact, v)
+            return vertex_mu2(compact, v, self.star_values[node])
+        return self._vertex_max(self.mu2_values, value, progress)
+
+    def results(self):
+        """The invariants known without further computation."""
+        results = dict(self.cached)
+        if self.eig is not None:
+            results["lambda"] = self.eig
+        for name, values in (("mu1", self.star_values), ("mu2", self.mu2_values)):
+            if all(node in values for node in self.graph):
+                results[name] = max(values.values(), default=0)
+        return results
+
+    def _vertex_max(self, values, vertex_value, progress):
+        compact = CompactGraph.from_networkx(self.graph)
+        nodes = compact.labels
+        best = max((values[node] for node in nodes if node in values), default=0)
+        for done, node in enumerate(nodes, 1):
+            if node not in values:
+                values[node] = vertex_value(compact, done - 1)
+                best = max(best, values[node])
+            if progress is not None:
+                progress(done, len(nodes), best)
+        return best
+
+    def _bits(self, node):
+        return 3 << (2 * self.slots[node])
+
+    def _add_slot(self, node):
+        k = len(self.adjacency) // 2
+        self.slots[node] = k
+        self.adjacency += [0, 0]
+        self.conflicts += [1 << (2 * k + 1), 1 << (2 * k)]
+        self.simplices.update((1 << (2 * k), 1 << (2 * k + 1)))
+
+    def _set_adjacent(self, u, v, adjacent):
+        ku, kv = self.slots[u], self.slots[v]
+        for bit in (2 * ku, 2 * ku + 1):
+            if adjacent:
+                self.adjacency[bit] |= 3 << (2 * kv)
+            else:
+                self.adjacency[bit] &= ~(3 << (2 * kv))
+        for bit in (2 * kv, 2 * kv + 1):
+            if adjacent:
+                self.adjacency[bit] |= 3 << (2 * ku)
+            else:
+                self.adjacency[bit] &= ~(3 << (2 * ku))
+
+    def _link(self, u, v):
+        self._set_adjacent(u, v, True)
+        ku, kv = self.slots[u], self.slots[v]
+        for a in (2 * ku, 2 * ku + 1):
+            for b in (2 * kv, 2 * kv + 1):
+                edge = (1 << a) | (1 << b)
+                self.simplices.add(edge)
+                common = self.adjacency[a] & self.adjacency[b]
+                self.simplices.update(iter_cliques(self.adjacency, self.conflicts, common, edge))
+
+    def _star_changes(self, u, v):
+        # star(w) changes iff w is an endpoint or sees both endpoints
+        return {u, v} | (set(self.graph[u]) & set(self.graph[v]))
+
+    def _forget(self, stars):
+        # μ2 at w reads star(w) and star(x) for every neighbour x of w
+        reach = set(stars)
+        for node in stars:
+            if node in self.graph:
+                reach.update(self.graph[node])
+        for node in stars:
+            self.star_values.pop(node, None)
+        for node in reach:
+            self.mu2_values.pop(node, None)
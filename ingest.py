@@ -0,0 +1,183 @@
+"""Readers for large graph files, straight into CompactGraph.
+
+    from ingest import load_graph_file, iter_graph_file
+    graph = load_graph_file("big.g6")
+
+Edge lists (.txt, .edges, .el: one "u v" pair per line, "#" comments, a
+single token declares an isolated vertex), graph6 (.g6), sparse6 (.s6) and
+NumPy adjacency matrices (.npy) are read in chunks of lines or rows and
+decoded with NumPy; only the edge arrays of the whole graph are held in
+memory. Graph store (.gbin) and pickle files are passed on to graphstore.
+"""
+import itertools
+import os
+
+import numpy as np
+
+from compact import CompactGraph
+from graphstore import EXTENSION, load_compact, load_graph
+
+EDGE_LIST_SUFFIXES = (".txt", ".edges", ".el")
+GRAPH6_SUFFIXES = (".g6", ".graph6")
+SPARSE6_SUFFIXES = (".s6", ".sparse6")
+SUFFIXES = (EXTENSION, ".pkl", ".npy") + EDGE_LIST_SUFFIXES + GRAPH6_SUFFIXES + SPARSE6_SUFFIXES
+CHUNK_LINES = 1 << 16
+CHUNK_ROWS = 1024
+
+
+def read_edge_lines(lines, chunk_lines=CHUNK_LINES):
+    """CompactGraph from an iterable of edge list lines. Labels are the
+    tokens, as ints (sorted) if all of them are integers, else as strings."""
+    pairs = []
+    singles = []
+    chunk = []
+    for line in lines:
+        tokens = line.split("#", 1)[0].split()
+        if len(tokens) >= 2:
+            chunk.append(tokens[:2])
+        elif tokens:
+            singles.append(tokens[0])
+        if len(chunk) >= chunk_lines:
+            pairs.append(np.array(chunk, dtype=str))
+            chunk = []
+    if chunk:
+        pairs.append(np.array(chunk, dtype=str))
+    pairs = np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=str)
+    tokens = np.concatenate([pairs.ravel(), np.array(singles, dtype=str)])
+    try:
+        numbers = tokens.astype(np.int64)
+    except ValueError:
+        labels, inverse = np.unique(tokens, return_inverse=True)
+        labels = labels.tolist()
+    else:
+        labels, inverse = np.unique(numbers, return_inverse=True)
+        labels = labels.tolist()
+    return CompactGraph.from_edges(labels, inverse[:2 * len(pairs)].reshape(-1, 2))
+
+
+def iter_edge_list_blocks(stream, name):
+    """Yields (name#i, CompactGraph) for every block of edge list lines in a
+    text stream, blocks being separated by blank lines."""
+    block = []
+    count = 0
+    for line in stream:
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield f"{name}#{count}", read_edge_lines(block)
+            block = []
+            count += 1
+    if block:
+        yield f"{name}#{count}", read_edge_lines(block)
+
+
+def _bits(data):
+    # graph6/sparse6 payload: 6 bits per printable byte, high bit first
+    values = np.frombuffer(data, dtype=np.uint8) - np.uint8(63)
+    return np.unpackbits(values[:, None], axis=1)[:, 2:].ravel()
+
+
+def _decode_size(data):
+    values = [b - 63 for b in data[:8]]
+    if values[0] < 63:
+        return values[0], data[1:]
+    if values[1] < 63:
+        return (values[1] << 12) | (values[2] << 6) | values[3], data[4:]
+    n = 0
+    for value in values[2:8]:
+        n = (n << 6) | value
+    return n, data[8:]
+
+
+def parse_graph6(line):
+    """CompactGraph from one graph6 line (bytes)."""
+    line = line.strip()
+    if line.startswith(b">>graph6<<"):
+        line = line[10:]
+    n, data = _decode_size(line)
+    bits = _bits(data)[:n * (n - 1) // 2]
+    if len(bits) < n * (n - 1) // 2:
+        raise ValueError("graph6 data too short")
+    # Bit k stands for the pair (i, j), i < j, in column order:
+    # k = j (j - 1) / 2 + i.
+    k = np.flatnonzero(bits).astype(np.int64)
+    j = ((1 + np.sqrt(1 + 8 * k.astype(np.float64))) // 2).astype(np.int64)
+    j[j * (j - 1) // 2 > k] -= 1
+    j[(j + 1) * j // 2 <= k] += 1
+    i = k - j * (j - 1) // 2
+    return CompactGraph.from_edges(range(n), np.stack([i, j], axis=1))
+
+
+def parse_sparse6(line):
+    """CompactGraph from one sparse6 line (bytes)."""
+    line = line.strip()
+    if line.startswith(b">>sparse6<<"):
+        line = line[11:]
+    if not line.startswith(b":"):
+        raise ValueError("sparse6 data must start with ':'")
+    n, data = _decode_size(line[1:])
+    k = max(1, (n - 1).bit_length())
+    bits = _bits(data)
+    records = bits[:len(bits) // (k + 1) * (k + 1)].reshape(-1, k + 1).astype(np.int64)
+    b = records[:, 0]
+    x = records[:, 1:] @ (1 << np.arange(k - 1, -1, -1, dtype=np.int64))
+    # The decoder keeps a current vertex v: each record first adds b to it,
+    # then either jumps to x (x > v) or emits the edge (x, v). Hence
+    # v_t = max(v_{t-1} + b_t, x_t), a running maximum once the cumulative
+    # b is subtracted.
+    steps = np.cumsum(b)
+    after = steps + np.maximum(np.maximum.accumulate(x - steps), 0)
+    before = np.concatenate([[0], after[:-1]]) + b
+    stop = np.flatnonzero((x >= n) | (before >= n))
+    end = stop[0] if len(stop) else len(x)
+    edge = (x <= before)[:end]
+    return CompactGraph.from_edges(range(n), np.stack([x[:end][edge], before[:end][edge]], axis=1))
+
+
+def read_adjacency_npy(path, chunk_rows=CHUNK_ROWS):
+    """CompactGraph from a square .npy adjacency matrix (any nonzero entry
+    is an edge), read through a memory map a block of rows at a time."""
+    matrix = np.load(path, mmap_mode="r")
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"{path}: adjacency matrix must be square, got shape {matrix.shape}")
+    n = matrix.shape[0]
+    edges = []
+    for start in range(0, n, chunk_rows):
+        rows, cols = np.nonzero(matrix[start:start + chunk_rows])
+        edges.append(np.stack([rows + start, cols], axis=1))
+    return CompactGraph.from_edges(range(n), np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.int64))
+
+
+def iter_graph_file(path):
+    """Yields (name, CompactGraph) for every graph in a file; graph6 and
+    sparse6 files may hold one graph per line."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in GRAPH6_SUFFIXES + SPARSE6_SUFFIXES:
+        parse = parse_graph6 if suffix in GRAPH6_SUFFIXES else parse_sparse6
+        with open(path, "rb") as f:
+            lines = (line for line in f if line.strip())
+            first, second = next(lines, None), next(lines, None)
+            if second is None:
+                if first is not None:
+                    yield path, parse(first)
+                return
+            for i, line in enumerate(itertools.chain([first, second], lines)):
+                yield f"{path}#{i}", parse(line)
+    else:
+        yield path, load_graph_file(path)
+
+
+def load_graph_file(path):
+    """CompactGraph from any supported file (the first graph of graph6 and
+    sparse6 files)."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == EXTENSION:
+        return load_compact(path)[0]
+    if suffix == ".pkl":
+        return CompactGraph.from_networkx(load_graph(path)[0])
+    if suffix == ".npy":
+        return read_adjacency_npy(path)
+    if suffix in GRAPH6_SUFFIXES + SPARSE6_SUFFIXES:
+        return next(iter_graph_file(path))[1]
+    with open(path) as f:
+        return read_edge_lines(f)
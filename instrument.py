@@ -0,0 +1,161 @@
+"""Counters and timers for the hot paths of logic.py.
+
+Instrumentation is off by default, and every hook then costs a single
+attribute check. Turn it on with `enable()`, or for a whole run by setting
+GRAPH_STATS to a JSON file name, which is written when the program exits
+(worker processes of a pool keep their own, unsaved stats):
+
+    GRAPH_STATS=stats.json python batch.py graphs/ -o out.jsonl -w 1
+
+    import instrument
+    instrument.enable(profile=True)
+    calculate_mu1(graph)
+    print(instrument.stats.as_dict())
+"""
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+_DISABLED = nullcontext()
+
+
+class Stats:
+    """Counters, timers (calls and total seconds) and, when enabled, a
+    cProfile report and the peak traced memory of each timed function."""
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = False
+        self.trace_memory = False
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.timers = {}
+            self.profiles = {}
+            self.peak_bytes = {}
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            calls, total = self.timers.get(name, (0, 0.0))
+            self.timers[name] = (calls + 1, total + seconds)
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        # Profiles and memory peaks are only taken for the outermost timed
+        # call of a thread; cProfile cannot nest and resetting the
+        # tracemalloc peak would spoil the enclosing measurement.
+        outermost = not getattr(self._local, "depth", 0)
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        profiler = None
+        if outermost and self.profile:
+            profiler = self.profiles.setdefault(name, cProfile.Profile())
+            try:
+                profiler.enable()
+            except ValueError:
+                # another profiler is running, e.g. in a second thread
+                profiler = None
+        if outermost and self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+            if profiler is not None:
+                profiler.disable()
+            if outermost and self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                with self.lock:
+                    self.peak_bytes[name] = max(self.peak_bytes.get(name, 0), peak)
+            self._local.depth -= 1
+
+    def as_dict(self, top=20):
+        """Plain dict of everything recorded; profiles are rendered as the
+        `top` entries by cumulative time."""
+        with self.lock:
+            result = {
+                "counters": dict(self.counters),
+                "timers": {name: {"calls": calls, "seconds": total} for name, (calls, total) in self.timers.items()},
+            }
+            if self.peak_bytes:
+                result["peak_bytes"] = dict(self.peak_bytes)
+            profiles = dict(self.profiles)
+        if profiles:
+            result["profiles"] = {}
+            for name, profiler in profiles.items():
+                text = io.StringIO()
+                pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+                result["profiles"][name] = text.getvalue()
+        return result
+
+    def to_json(self, path=None):
+        """The stats as a JSON string, also written to `path` if given."""
+        text = json.dumps(self.as_dict(), indent=1)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+
+stats = Stats()
+
+
+def enable(profile=False, trace_memory=False):
+    stats.enabled = True
+    stats.profile = profile
+    stats.trace_memory = trace_memory
+
+
+def disable():
+    stats.enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def count(name, n=1):
+    if stats.enabled:
+        stats.count(name, n)
+
+
+def timer(name):
+    return stats.timer(name) if stats.enabled else _DISABLED
+
+
+def timed(name):
+    """Decorator recording every call of the function under timer `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not stats.enabled:
+                return function(*args, **kwargs)
+            with stats.timer(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+if os.environ.get("GRAPH_STATS"):
+    enable()
+    atexit.register(stats.to_json, os.environ["GRAPH_STATS"])
@@ -1,18 +1,27 @@
-import networkx as nx
-import itertools
 import numpy as np
-from numpy import linalg as LA
-import heapq
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from cliques import iter_cliques, mask_members
+from compact import CompactGraph
+from results import ResultsDB, results_db
+from instrument import count, timed, timer
+from transition import blowup_simplices, transition_csr
+from spectral import perron_vector, spectral_radius
 
 def blowup(graph):
     ret_graph = graph.copy()
     new_edges = []
     inverse_nodes = {}
+    level = 1 + max((level for _, level in ret_graph.nodes(data="blowup", default=0)), default=0)
 
     for node in list(ret_graph.nodes):
         inverse_node = f"-{node}"
+        while inverse_node in ret_graph:
+            inverse_node = f"-{inverse_node}"
         inverse_nodes[node] = inverse_node
-        ret_graph.add_node(inverse_node) 
+        ret_graph.add_node(inverse_node, blowup=level, inverse_of=node)
             
     for node1, node2 in ret_graph.edges:
         if node1 in inverse_nodes and node2 in inverse_nodes:
@@ -26,20 +35,93 @@ def blowup(graph):
     return ret_graph        
 
 def unblowup(graph):
+    # Inverse nodes of the latest blow-up carry the highest "blowup" level;
+    # graphs saved before levels were recorded fall back to the "-" prefix.
     ret_graph = graph.copy()
-    for node in list(ret_graph.nodes):
-        if node.startswith("-"):
+    level = max((level for _, level in ret_graph.nodes(data="blowup", default=0)), default=0)
+    for node, node_level in list(ret_graph.nodes(data="blowup", default=0)):
+        if level > 0 and node_level == level:
+            ret_graph.remove_node(node)
+        elif level == 0 and isinstance(node, str) and node.startswith("-"):
             ret_graph.remove_node(node)
     
     return ret_graph
 
-def calculate_graph_eigenvalue(graph):
-    graph_copy = graph.copy()
-    print (graph)
-    graph_copy = blowup(graph_copy)
-    eig = 0
-    if graph_copy.size() != 0:
-        eig = calculate_blowup_eigenvalue(graph_copy)
+class EigenvalueCache:
+    """Blow-up eigenvalues and other invariants keyed by isomorphism class.
+
+    Graphs are keyed by their canonical form. At most `maxsize` eigenvalues
+    are kept in memory (least recently used first out); behind that sits a
+    `ResultsDB` shared by all sessions and processes. Graphs without a
+    cheap canonical form (`CompactGraph.key` is None) are not cached.
+    """
+
+    def __init__(self, maxsize=4096, db=None):
+        self.maxsize = maxsize
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = db if db is not None else ResultsDB(None)
+
+    def attach(self, path):
+        self.db = ResultsDB(path)
+
+    def lookup(self, graph, field="lambda"):
+        """`graph` is a CompactGraph; returns None on a miss."""
+        key = graph.key
+        if key is None:
+            count("cache_skipped")
+            return None
+        with self.lock:
+            if (key, field) in self.values:
+                self.values.move_to_end((key, field))
+                count("cache_hits")
+                return self.values[key, field]
+        known = self.db.get(key) or {}
+        if field in known:
+            count("db_hits")
+            self._remember(key, field, known[field])
+        else:
+            count("cache_misses")
+        return known.get(field)
+
+    def store(self, graph, value, field="lambda", **extra):
+        """Records `value` under `field`, plus any `extra` invariants for the
+        results database only (e.g. simplices=...)."""
+        if graph.key is None:
+            return
+        self._remember(graph.key, field, value)
+        self.db.put(graph.key, graph.n, **{field: value}, **extra)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def _remember(self, key, field, value):
+        with self.lock:
+            self.values[key, field] = value
+            self.values.move_to_end((key, field))
+            while len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+
+eigenvalue_cache = EigenvalueCache(db=results_db)
+
+def calculate_graph_eigenvalue(graph, cache=None):
+    return compact_eigenvalue(CompactGraph.from_networkx(graph), cache)
+
+def compact_eigenvalue(graph, cache=None):
+    if graph.number_of_edges() == 0:
+        return 0
+    if cache is None:
+        cache = eigenvalue_cache
+    eig = cache.lookup(graph)
+    if eig is None:
+        eig = _solve_eigenvalue(graph, cache)
+    return eig
+
+def _solve_eigenvalue(graph, cache):
+    # compact_eigenvalue after a cache miss
+    eig, simplices = blowup_spectrum(graph)
+    cache.store(graph, eig, simplices=simplices)
     return eig
     
 def star(graph, node):
@@ -54,111 +136,256 @@ def star(graph, node):
     return graph_copy
 
 
-def calculate_mu1(graph):
-    graph_copy = graph.copy()
-    max_mu1 = 0
-    for node in graph:
-        subgraph = star(graph_copy, node)
-        mu1 = calculate_graph_eigenvalue(subgraph)
-        if max_mu1 < mu1:
-            max_mu1 = mu1
-    return max_mu1
-
-def calculate_extensions(graph, subgraph):
-    extensions = [0]
-    for node in subgraph:
-        extension_graph = star(graph, node)
-        shared_nodes = set(subgraph.nodes) & set(extension_graph.nodes)
-        extension_graph.remove_nodes_from(shared_nodes)
-        print(extension_graph)
-        print(extension_graph.size())
-        print(extensions)
-        if extension_graph.size() != 0:
-            print("added extension")
-            print ("loop 2, node: " + node)
-            extensions.append(calculate_graph_eigenvalue(extension_graph))
-    return np.array(extensions, dtype=np.float64)
-
-def calculate_mu2(graph):
-    graph_copy = graph.copy()
-    max_mu2 = 0
-
-    for node in graph:
-        print("loop 1, node: " + node)
-        subgraph = star(graph_copy, node)
-        mu1 = calculate_graph_eigenvalue(subgraph)
-        extensions = calculate_extensions(graph_copy, subgraph)
-        print("extensions: " + str(extensions))
-        bigex = heapq.nlargest(1, extensions)
-        if (len(bigex) < 2):
-            mu2 = 0
-        else:
-            mu2 = mu1 * bigex[0] * bigex[1]
-        if max_mu2 < mu2:
-            max_mu2 = mu2
-    
-    return max_mu2
+_worker_graph = None
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+def _on_worker(task, vertices):
+    return task(_worker_graph, vertices)
+
+def _max_chunk(vertex_value, bounded, graph, vertices):
+    best = 0
+    for v in vertices:
+        best = max(best, vertex_value(graph, v, best) if bounded else vertex_value(graph, v))
+    return best
+
+def _values_chunk(vertex_value, graph, vertices):
+    return [vertex_value(graph, v) for v in vertices]
+
+def _over_chunks(graph, task, vertices, workers, chunksize, on_result):
+    # Runs task(graph, chunk) for chunks of `vertices` in a process pool;
+    # the graph is shipped to each worker once.
+    if chunksize is None:
+        chunksize = max(1, len(vertices) // (4 * workers))
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(graph,))
+    try:
+        futures = {}
+        for i in range(0, len(vertices), chunksize):
+            chunk = vertices[i:i + chunksize]
+            futures[pool.submit(_on_worker, task, chunk)] = chunk
+        for future in as_completed(futures):
+            on_result(futures[future], future.result())
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def max_over_vertices(graph, vertex_value, workers=None, chunksize=None, progress=None, order=None, bounded=False):
+    """max(vertex_value(graph, v) for v in graph) over a CompactGraph,
+    optionally spread over a pool of `workers` processes. The graph is
+    shipped to each worker once; tasks only carry vertex lists.
+    `progress(done, total, best)` is called whenever more vertices are
+    finished; an exception raised from it aborts the computation.
+
+    Vertices are visited in `order` if given. With `bounded`, vertex_value
+    is called as vertex_value(graph, v, best) with the best value so far
+    and only has to be exact where it exceeds it."""
+    vertices = list(range(graph.n)) if order is None else list(order)
+    n = len(vertices)
+    best = 0
+    if not workers or workers <= 1 or n <= 1:
+        for done, v in enumerate(vertices, 1):
+            best = max(best, vertex_value(graph, v, best) if bounded else vertex_value(graph, v))
+            if progress is not None:
+                progress(done, n, best)
+        return best
+    done = 0
+
+    def on_result(chunk, value):
+        nonlocal best, done
+        best = max(best, value)
+        done += len(chunk)
+        if progress is not None:
+            progress(done, n, best)
+
+    _over_chunks(graph, partial(_max_chunk, vertex_value, bounded), vertices, workers, chunksize, on_result)
+    return best
+
+def vertex_values(graph, vertex_value, workers=None, chunksize=None, progress=None):
+    """[vertex_value(graph, v) for v in graph], computed like
+    `max_over_vertices`; `progress` gets the maximum so far."""
+    n = graph.n
+    values = [0] * n
+    if not workers or workers <= 1 or n <= 1:
+        for v in range(n):
+            values[v] = vertex_value(graph, v)
+            if progress is not None:
+                progress(v + 1, n, max(values[:v + 1]))
+        return values
+    done = 0
+
+    def on_result(chunk, chunk_values):
+        nonlocal done
+        for v, value in zip(chunk, chunk_values):
+            values[v] = value
+        done += len(chunk)
+        if progress is not None:
+            progress(done, n, max(values))
+
+    _over_chunks(graph, partial(_values_chunk, vertex_value), list(range(n)), workers, chunksize, on_result)
+    return values
+
+def star_eigenvalue(graph, v):
+    return compact_eigenvalue(graph.star(v))
+
+def compact_mu1(graph, workers=None, progress=None):
+    """(μ1, star eigenvalue of every vertex) of a CompactGraph."""
+    stars = vertex_values(graph, star_eigenvalue, workers, progress=progress)
+    return max(stars, default=0), stars
+
+def compact_mu2(graph, stars, workers=None, progress=None):
+    """μ2 of a CompactGraph given its star eigenvalues. Vertices with large
+    stars go first, so that the running maximum prunes early."""
+    order = sorted(range(graph.n), key=lambda v: -stars[v])
+    return max_over_vertices(graph, partial(_mu2_with_star, stars), workers, progress=progress, order=order, bounded=True)
+
+def _mu2_with_star(stars, graph, v, best):
+    return vertex_mu2(graph, v, stars[v], best)
+
+def calculate_mu(graph, workers=None, progress=None):
+    """(μ1, μ2) of a networkx graph. The star eigenvalues are computed once
+    and shared; `progress` sees both passes as one run over 2n steps."""
+    compact = CompactGraph.from_networkx(graph)
+    mu1 = eigenvalue_cache.lookup(compact, "mu1")
+    mu2 = eigenvalue_cache.lookup(compact, "mu2")
+    if mu2 is None or mu1 is None:
+        n = compact.n
+        first = second = None
+        if progress is not None:
+            first = lambda done, total, best: progress(done, 2 * n, 0)
+            second = lambda done, total, best: progress(n + done, 2 * n, best)
+        mu1, stars = compact_mu1(compact, workers, first)
+        eigenvalue_cache.store(compact, mu1, "mu1")
+        mu2 = compact_mu2(compact, stars, workers, second)
+        eigenvalue_cache.store(compact, mu2, "mu2")
+    return mu1, mu2
+
+@timed("calculate_mu1")
+def calculate_mu1(graph, workers=None, progress=None):
+    compact = CompactGraph.from_networkx(graph)
+    value = eigenvalue_cache.lookup(compact, "mu1")
+    if value is None:
+        value = compact_mu1(compact, workers, progress)[0]
+        eigenvalue_cache.store(compact, value, "mu1")
+    return value
+
+def extension_graphs(graph, v):
+    """For every neighbour x of v with edges outside N(v): the subgraph
+    induced on N(x) minus N(v)."""
+    masks = graph.masks
+    for x in graph.neighbors(v).tolist():
+        extension_graph = graph.induced(list(mask_members(masks[x] & ~masks[v])))
+        count("extensions_tested")
+        if extension_graph.number_of_edges() != 0:
+            count("extensions")
+            yield extension_graph
+
+def eigenvalue_bound(graph):
+    """(bound, exact): an upper bound on the blow-up eigenvalue of a
+    CompactGraph with edges. It is the cached value if known (exact), else
+    the number of blow-up simplices (every row of the transition matrix has
+    at most that many ones)."""
+    known = eigenvalue_cache.lookup(graph)
+    if known is not None:
+        return known, True
+    return sum(1 << bin(clique).count("1") for clique in iter_cliques(graph.masks)), False
+
+def vertex_mu2(graph, v, mu1=None, best=0):
+    """μ1(v) times the two largest extension eigenvalues at v (0 with fewer
+    than two extensions). Extensions are solved in decreasing order of
+    `eigenvalue_bound`; one is skipped if its bound cannot enter the top
+    two or cannot lift the product above `best`. So the result is exact
+    whenever it exceeds `best`, and below `best` otherwise."""
+    if mu1 is None:
+        mu1 = star_eigenvalue(graph, v)
+    candidates = sorted(((*eigenvalue_bound(h), i, h) for i, h in enumerate(extension_graphs(graph, v))), key=lambda c: -c[0])
+    top = [0, 0]
+    for skipped, (bound, exact, _, extension_graph) in enumerate(candidates):
+        if bound <= top[1] or mu1 * bound * max(top[0], bound) <= best:
+            count("extensions_pruned", len(candidates) - skipped)
+            break
+        # the bound came from the same cache lookup compact_eigenvalue does
+        value = bound if exact else _solve_eigenvalue(extension_graph, eigenvalue_cache)
+        if value > top[0]:
+            top = [value, top[0]]
+        elif value > top[1]:
+            top[1] = value
+    return mu1 * top[0] * top[1]
+
+@timed("calculate_mu2")
+def calculate_mu2(graph, workers=None, progress=None):
+    return calculate_mu(graph, workers, progress)[1]
 
 # Probleme:
 # ist s1 = s2 erlaubt?
 # was, wenn es nur ein s1 gibt? Oder gar keins?
 
 def calculate_blowup_eigenvalue(g):
-    cliques = list(nx.find_cliques(g))
-
-    all_cliques = []
-    for clique in cliques:
-        for r in range(1, len(clique) + 1):
-            for subclique in itertools.combinations(clique, r):
-                subclique_set = set(subclique)
-                if not has_inverse_in_clique(subclique_set):
-                    if frozenset(subclique_set) not in all_cliques:
-                        all_cliques.append(frozenset(subclique_set))
-
-    clique_index = {clique: idx for idx, clique in enumerate(all_cliques)}
-
-    matrix = [[0] * len(all_cliques) for _ in range(len(all_cliques))]
-
-    for alpha in all_cliques:
-        for beta in all_cliques:
-            if check_condition(set(alpha), set(beta), g):
-                matrix[clique_index[alpha]][clique_index[beta]] = 1
-
-    A = np.matrix(matrix)
-    values, _ = LA.eig(A)
-    largesteigenwert = np.argmax(values)
-    if np.any(values == 0):
-        print("not invertable")
-    return values[largesteigenwert]
-    
-def has_inverse_in_clique(clique):
-    for node in clique:
-        if node.startswith("-"):
-            uninverse_node = node[1:]
-            if uninverse_node in clique:
-                return True
-        else:
-            inverse_node = f"-{node}"
-            if inverse_node in clique:
-                return True
-    return False
-
-def check_condition(alpha, beta, g):
-    for v in alpha:
-        if v.startswith("-"):
-            uninverse_v = v[1:]
-            if uninverse_v in beta:
-                return False
-        else:
-            inverse_v = f"-{v}"
-            if inverse_v in beta:
-                return False
-            
+    return blowup_eigenvalue(CompactGraph.from_networkx(unblowup(g)))
+
+def blowup_eigenvalue(graph):
+    """Blow-up eigenvalue of a CompactGraph. The blow-up is never built:
+    its simplices are the base cliques with a sign per vertex."""
+    return blowup_spectrum(graph)[0]
+
+def _blowup_matrix(graph):
+    with timer("blowup_simplices"):
+        simplices, forbidden = blowup_simplices(graph.masks)
+    count("simplices", len(simplices))
+    with timer("transition_matrix"):
+        matrix = transition_csr(simplices, forbidden)
+    count("matrix_entries_tested", len(simplices) ** 2)
+    count("matrix_nonzeros", matrix.nnz)
+    return simplices, matrix
+
+@timed("blowup_spectrum")
+def blowup_spectrum(graph):
+    """(blow-up eigenvalue, number of blow-up simplices) of a CompactGraph."""
+    simplices, matrix = _blowup_matrix(graph)
+    with timer("eigen_solve"):
+        value = spectral_radius(matrix)
+    count("eigen_solves")
+    return value, matrix.shape[0]
+
+@timed("blowup_perron")
+def blowup_perron(graph):
+    """(blow-up eigenvalue, simplices, weights) of a CompactGraph from a
+    single solve. `simplices` is the packed table of `blowup_simplices` and
+    `weights` the Perron vector over its rows, nonnegative with sum 1."""
+    simplices, matrix = _blowup_matrix(graph)
+    with timer("eigen_solve"):
+        value, weights = perron_vector(matrix)
+    count("eigen_solves")
+    return value, simplices, weights
+
+def _signed_members(simplices, n):
+    # (N, 2n) boolean membership: columns 0..n-1 are the positive copies of
+    # the vertices, n..2n-1 the inverse ones.
+    words = simplices.shape[1] // 2
+    halves = [simplices[:, :words], simplices[:, words:]]
+    bits = [np.unpackbits(half.astype("<u8").view(np.uint8), axis=1, bitorder="little")[:, :n] for half in halves]
+    return np.hstack(bits).astype(bool)
 
-    common_link = set(g.nodes())
-    for node in alpha:
-        common_link = common_link.intersection(set(g.neighbors(node)))
+def dominant_vertices(graph):
+    """(blow-up eigenvalue, {node: weight}): the Perron weight of all blow-up
+    simplices containing either copy of each node of a networkx graph."""
+    graph = CompactGraph.from_networkx(graph)
+    value, simplices, weights = blowup_perron(graph)
+    signed = weights @ _signed_members(simplices, graph.n)
+    return value, dict(zip(graph.labels, (signed[:graph.n] + signed[graph.n:]).tolist()))
 
-    if not common_link.isdisjoint(beta - alpha):
-        return False
-    return True
\ No newline at end of file
+def dominant_simplices(graph, top=10):
+    """(blow-up eigenvalue, [(simplex, weight)]) for the `top` blow-up simplices
+    of largest Perron weight (all with top=None) of a networkx graph. A
+    simplex is a tuple of nodes, the inverse copy of a node written as
+    ("-", node)."""
+    graph = CompactGraph.from_networkx(graph)
+    value, simplices, weights = blowup_perron(graph)
+    order = np.argsort(-weights, kind="stable")[:top]
+    members = _signed_members(simplices[order], graph.n)
+    result = []
+    for row, weight in zip(members, weights[order].tolist()):
+        simplex = [graph.labels[v] for v in np.flatnonzero(row[:graph.n])]
+        simplex += [("-", graph.labels[v]) for v in np.flatnonzero(row[graph.n:])]
+        result.append((tuple(simplex), weight))
+    return value, result
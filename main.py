@@ -1,20 +1,88 @@
 import tkinter as tk
 from tkinter import messagebox
 import networkx as nx
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import itertools
+import numpy as np
 from numpy import linalg as LA
-from dask.array import argmax
 from tkinter import filedialog
-import pickle
+import graphstore
+import ingest
+import queue
+import threading
 from logic import *
+from incremental import IncrementalAnalysis
+
+class CalculationCancelled(Exception):
+    pass
+
+class GraphView:
+    """One figure and canvas per frame, reused for every redraw.
+
+    Node positions are kept between redraws; only nodes without a position
+    are laid out, starting next to their placed neighbours while the others
+    stay fixed. Redraws are debounced, and graphs with more than
+    FAST_NODES nodes are drawn without labels.
+    """
+    DEBOUNCE_MS = 50
+    FAST_NODES = 150
+
+    def __init__(self, frame):
+        self.frame = frame
+        # A plain Figure, not plt.subplots: pyplot would keep every figure
+        # alive in its global registry.
+        self.figure = Figure(figsize=(4, 4))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=frame)
+        self.canvas.get_tk_widget().pack()
+        self.positions = {}
+        self.graph = None
+        self.pending = None
+
+    def show(self, graph):
+        self.graph = graph
+        if self.pending is not None:
+            self.frame.after_cancel(self.pending)
+        self.pending = self.frame.after(self.DEBOUNCE_MS, self.draw)
+
+    def layout(self, graph):
+        self.positions = {node: pos for node, pos in self.positions.items() if node in graph}
+        new = [node for node in graph if node not in self.positions]
+        if not new:
+            return self.positions
+        if not self.positions:
+            self.positions = nx.spring_layout(graph, seed=0, iterations=50 if len(graph) <= self.FAST_NODES else 15)
+            return self.positions
+        rng = np.random.default_rng(len(self.positions))
+        start = dict(self.positions)
+        for node in new:
+            placed = [start[u] for u in graph[node] if u in start]
+            center = np.mean(placed, axis=0) if placed else np.zeros(2)
+            start[node] = center + rng.normal(scale=0.1, size=2)
+        # Placed nodes stay fixed, so the picture does not jump on each edit.
+        self.positions = nx.spring_layout(graph, pos=start, fixed=list(self.positions), iterations=30)
+        return self.positions
+
+    def draw(self):
+        self.pending = None
+        graph = self.graph
+        positions = self.layout(graph)
+        self.ax.clear()
+        self.ax.set_axis_off()
+        if len(graph) > self.FAST_NODES:
+            nx.draw_networkx_edges(graph, positions, ax=self.ax, width=0.3, alpha=0.5)
+            nx.draw_networkx_nodes(graph, positions, ax=self.ax, node_color='lightblue', node_size=8)
+        else:
+            nx.draw(graph, positions, with_labels=True, ax=self.ax, node_color='lightblue', font_weight='bold', node_size=100)
+        self.canvas.draw_idle()
 
 class GraphInputGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Graph Input Interface")
         self.graph = nx.Graph()
+        self.analysis = IncrementalAnalysis(self.graph)
         self.star_graph = nx.Graph()
 
         tk.Label(root, text="Node:").grid(row=0, column=0, padx=5, pady=5)
@@ -34,6 +102,7 @@ class GraphInputGUI:
 
         self.star_canvas_frame = tk.Frame(root)
         self.star_canvas_frame.grid(row=2, column=3,  columnspan=3)
+        self.views = {frame: GraphView(frame) for frame in (self.graph_canvas_frame, self.star_canvas_frame)}
 
 
         self.eigenwert_label = tk.Label(root, text="No eigenvalue calculated yet")
@@ -42,6 +111,8 @@ class GraphInputGUI:
         tk.Button(root, text="Calculate", command=self.calculate_main_eigenvalue).grid(row=4, column=0)
         tk.Button(root, text="two point blow-up", command=self.do_blowup).grid(row=4, column=1)
         tk.Button(root, text="undo two point blow-up", command=self.do_unblowup).grid(row=4, column=2)
+        self.cancel_button = tk.Button(root, text="Cancel", command=self.cancel_calculation, state=tk.DISABLED)
+        self.cancel_button.grid(row=4, column=3)
         self.load_button = tk.Button(root, text="Load Graph", command=self.load_graph).grid(row=5, column=0)
         self.save_button = tk.Button(root, text="Save Graph", command=self.save_graph).grid(row=5, column=1)
         self.clear_button = tk.Button(root, text="Clear Graph", command=self.clear_graph).grid(row=5, column=2)
@@ -50,9 +121,21 @@ class GraphInputGUI:
         self.star_button = tk.Button(root, text="Get Star", command=self.reduce_to_star).grid(row=6, column=1)
         self.star_to_graph_button = tk.Button(root, text="promote star to graph", command=self.star_to_graph).grid(row=6, column=2)
         self.star_label = tk.Label(root, text="no Star calculated yet").grid(row=7, columnspan=5)
+        self.progress_label = tk.Label(root, text="")
+        self.progress_label.grid(row=8, columnspan=5)
+
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.results = queue.Queue()
+
+    def set_graph(self, graph):
+        self.graph = graph
+        self.analysis = IncrementalAnalysis(self.graph)
 
     def star_to_graph(self):
-        self.graph = self.star_graph
+        if self.calculation_running():
+            return
+        self.set_graph(self.star_graph)
         self.update_graph_display(self.graph_canvas_frame, self.graph)
 
     def reduce_to_star(self):
@@ -60,38 +143,72 @@ class GraphInputGUI:
         self.update_graph_display(self.star_canvas_frame, self.star_graph)
 
     def do_blowup(self):
-        self.graph = blowup(self.graph)
+        if self.calculation_running():
+            return
+        self.set_graph(blowup(self.graph))
         self.update_graph_display(self.graph_canvas_frame, self.graph)
 
     def do_unblowup(self):
-        self.graph = unblowup(self.graph)
+        if self.calculation_running():
+            return
+        self.set_graph(unblowup(self.graph))
         self.update_graph_display(self.graph_canvas_frame, self.graph)
 
     def clear_graph(self):
-        self.graph.clear()
+        if self.calculation_running():
+            return
+        self.set_graph(nx.Graph())
         self.update_graph_display(self.graph_canvas_frame, self.graph)
 
     def save_graph(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".pkl", filetypes=[("Pickle Files", "*.pkl"), ("All Files", "*.*")])
+        if self.calculation_running():
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=graphstore.EXTENSION, filetypes=[("Graph Files", "*" + graphstore.EXTENSION), ("All Files", "*.*")])
         if file_path:
-            with open(file_path, "wb") as f:
-                pickle.dump(self.graph, f)
+            graphstore.save_graph(file_path, self.graph, self.analysis.results())
     
     def load_graph(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Pickle Files", "*.pkl"), ("All Files", "*.*")])
+        if self.calculation_running():
+            return
+        file_path = filedialog.askopenfilename(filetypes=[
+            ("Graph Files", "*" + graphstore.EXTENSION),
+            ("Pickle Files", "*.pkl"),
+            ("Edge Lists", " ".join("*" + suffix for suffix in ingest.EDGE_LIST_SUFFIXES)),
+            ("graph6/sparse6", " ".join("*" + suffix for suffix in ingest.GRAPH6_SUFFIXES + ingest.SPARSE6_SUFFIXES)),
+            ("NumPy Adjacency Matrices", "*.npy"),
+            ("All Files", "*.*"),
+        ])
         if file_path:
-            with open(file_path, "rb") as f:
-                self.graph = pickle.load(f)
+            if file_path.lower().endswith((graphstore.EXTENSION, ".pkl")):
+                graph, results = graphstore.load_graph(file_path)
+            else:
+                try:
+                    graph, results = ingest.load_graph_file(file_path).to_networkx(), {}
+                except (OSError, ValueError) as e:
+                    messagebox.showerror("Error", f"Could not read {file_path}: {e}")
+                    return
+            self.set_graph(graph)
+            self.analysis.restore(results)
+            if results:
+                self.eigenwert_label.config(text="cached: " + ", ".join(f"{name} = {value}" for name, value in results.items()))
         self.update_graph_display(self.graph_canvas_frame, self.graph)
 
+    def calculation_running(self):
+        if self.worker is not None and self.worker.is_alive():
+            messagebox.showerror("Error", "Wait for the calculation to finish or cancel it first.")
+            return True
+        return False
+
     def add_node(self, string=None):
+        if self.calculation_running():
+            return
         if string == None:
             node = self.node_entry.get().strip()
         else:
             node = string
         if node:
             if node not in self.graph:
-                self.graph.add_node(node)
+                self.analysis.add_node(node)
                 self.update_graph_display(self.graph_canvas_frame, self.graph)
                 self.node_entry.delete(0, tk.END)
             else:
@@ -100,6 +217,8 @@ class GraphInputGUI:
             messagebox.showerror("Error", "Node cannot be empty.")              
 
     def add_edge(self, node1=None, node2=None):
+        if self.calculation_running():
+            return
         if node1 == None:
             node1 = self.edge_node1_entry.get().strip()
         if node2 == None:
@@ -107,7 +226,7 @@ class GraphInputGUI:
         if node1 and node2:
             if node1 in self.graph and node2 in self.graph:
                 if not self.graph.has_edge(node1, node2):
-                    self.graph.add_edge(node1, node2)
+                    self.analysis.add_edge(node1, node2)
                     self.update_graph_display(self.graph_canvas_frame, self.graph)
                     self.edge_node1_entry.delete(0, tk.END)
                     self.edge_node2_entry.delete(0, tk.END)
@@ -119,21 +238,68 @@ class GraphInputGUI:
             messagebox.showerror("Error", "Both nodes must be specified.")
 
     def update_graph_display(self, ui_canvas, graph):
-        for widget in ui_canvas.winfo_children():
-            widget.destroy()
-
-        fig, ax = plt.subplots(figsize=(4, 4))
-        nx.draw(graph, with_labels=True, ax=ax, node_color='lightblue', font_weight='bold', node_size=100)
-        
-        canvas = FigureCanvasTkAgg(fig, master=ui_canvas)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
+        self.views[ui_canvas].show(graph)
 
     def calculate_main_eigenvalue(self):
-        eig = calculate_graph_eigenvalue(self.graph)
-        mu1 = calculate_mu1(self.graph)
-        mu2 = calculate_mu2(self.graph)
-        self.eigenwert_label.config(text="λ = " + str(eig) + ", μ1 = " + str(mu1) + ", μ2 = " + str(mu2))
+        if self.calculation_running():
+            return
+        self.cancel_event = threading.Event()
+        self.results = queue.Queue()
+        self.partial = {"λ": "…", "μ1": "…", "μ2": "…"}
+        self.show_partial_results()
+        self.worker = threading.Thread(target=self.run_calculation, args=(self.analysis, self.cancel_event, self.results), daemon=True)
+        self.worker.start()
+        self.cancel_button.config(state=tk.NORMAL)
+        self.root.after(100, self.poll_results)
+
+    def cancel_calculation(self):
+        self.cancel_event.set()
+        self.progress_label.config(text="Cancelling…")
+
+    def run_calculation(self, analysis, cancel_event, results):
+        # Runs on the worker thread; only talks to Tk through the queue.
+        def reporter(name):
+            def report(done, total, best):
+                if cancel_event.is_set():
+                    raise CalculationCancelled()
+                results.put(("progress", name, done, total, best))
+            return report
+
+        try:
+            results.put(("result", "λ", analysis.eigenvalue(reporter("λ"))))
+            results.put(("result", "μ1", analysis.mu1(reporter("μ1"))))
+            results.put(("result", "μ2", analysis.mu2(reporter("μ2"))))
+            results.put(("finished", "Done"))
+        except CalculationCancelled:
+            results.put(("finished", "Cancelled"))
+        except Exception as e:
+            results.put(("finished", f"Failed: {e}"))
+
+    def poll_results(self):
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress":
+                _, name, done, total, best = message
+                if best is not None:
+                    self.partial[name] = f"≥ {best}"
+                unit = "matrix rows" if name == "λ" else "vertices"
+                self.progress_label.config(text=f"{name}: {done}/{total} {unit}")
+            elif message[0] == "result":
+                _, name, value = message
+                self.partial[name] = str(value)
+            else:
+                self.progress_label.config(text=message[1])
+                self.cancel_button.config(state=tk.DISABLED)
+                self.show_partial_results()
+                return
+            self.show_partial_results()
+        self.root.after(100, self.poll_results)
+
+    def show_partial_results(self):
+        self.eigenwert_label.config(text="λ = " + self.partial["λ"] + ", μ1 = " + self.partial["μ1"] + ", μ2 = " + self.partial["μ2"])
    
 if __name__ == "__main__":
     root = tk.Tk()
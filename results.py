@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import threading
+import time
+
+from compact import bounded_key
+
+# Invariants kept per isomorphism class:
+#   lambda, mu1, mu2  blow-up eigenvalue and the μ1/μ2 maxima from logic.py
+#   simplices         number of blow-up simplices (size of the transition matrix)
+#   cliques, rho      clique count and good-matrix spectral radius from g.py
+FIELDS = ("lambda", "mu1", "mu2", "simplices", "cliques", "rho")
+COUNTS = ("simplices", "cliques")
+# Bumped whenever stored values of an earlier version must not be reused
+# (2: μ2 was always 0 before).
+VERSION = 2
+DEFAULT_PATH = os.environ.get(
+    "GRAPH_RESULTS_DB",
+    os.path.join(os.path.expanduser("~"), ".cache", "estimate-growth-of-groups", "results.sqlite"),
+)
+MAX_ENTRIES = 1_000_000
+# Reads only note their keys; recency is written for this many at a time.
+TOUCH_BATCH = 256
+
+
+def graph_key(masks):
+    """Database key of a graph given as neighbour bitmasks; None for graphs
+    whose canonical form is too costly to find (see compact.bounded_key)."""
+    return bounded_key(masks)
+
+
+class ResultsDB:
+    """Invariants of every graph analysed so far, in an SQLite file keyed by
+    the canonical form of the graph, so isomorphic graphs share one row.
+
+    Several processes may read and write the same file: it is opened in WAL
+    mode and every write is a single upsert. Each process (and fork) opens
+    its own connection on first use. Once more than `max_entries` rows are
+    stored, the least recently used ones are deleted; the recency of rows
+    that were only read is written in batches, so that readers do not queue
+    for the write lock. `path=None` or "" keeps nothing.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=MAX_ENTRIES, timeout=30.0):
+        self.path = path or None
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self._db = None
+        self._pid = None
+        self._writes = 0
+        self._touched = set()
+
+    def _connection(self):
+        if self._db is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # Schema setup under a write lock, so that processes opening a
+            # new file together do not drop each other's table.
+            columns = ", ".join(f'"{field}" ' + ("INTEGER" if field in COUNTS else "REAL") for field in FIELDS)
+            db.isolation_level = None
+            db.execute("BEGIN IMMEDIATE")
+            if db.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+                db.execute("DROP TABLE IF EXISTS results")
+                db.execute(f"PRAGMA user_version={VERSION}")
+            db.execute(f"CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, nodes INTEGER, {columns}, used REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+            db.execute("COMMIT")
+            db.isolation_level = ""
+            self._db = db
+            self._pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        """Known invariants of the graph with this key, as a dict without
+        the ones never computed; None if the graph is unknown."""
+        if self.path is None:
+            return None
+        columns = ", ".join(f'"{field}"' for field in FIELDS)
+        with self.lock:
+            db = self._connection()
+            row = db.execute(f"SELECT {columns} FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched.add(key)
+            if len(self._touched) >= TOUCH_BATCH:
+                with db:
+                    self._touch(db)
+        return {field: value for field, value in zip(FIELDS, row) if value is not None}
+
+    def put(self, key, nodes, **values):
+        """Records some invariants of a graph, keeping the others."""
+        if self.path is None:
+            return
+        unknown = set(values) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown result fields {sorted(unknown)}")
+        names = list(values)
+        columns = ", ".join(f'"{name}"' for name in names)
+        updates = ", ".join(f'"{name}" = excluded."{name}"' for name in names)
+        with self.lock:
+            db = self._connection()
+            with db:
+                self._touch(db)
+                db.execute(
+                    f"INSERT INTO results (key, nodes, {columns}, used) VALUES (?, ?, {', '.join('?' * len(names))}, ?) "
+                    f"ON CONFLICT(key) DO UPDATE SET {updates}, used = excluded.used",
+                    (key, nodes, *(int(values[name]) if name in COUNTS else float(values[name]) for name in names), time.time()),
+                )
+            self._writes += 1
+            if self._writes % 256 == 0:
+                self._evict(db)
+
+    def _touch(self, db):
+        if self._touched:
+            now = time.time()
+            db.executemany("UPDATE results SET used = ? WHERE key = ?", [(now, key) for key in self._touched])
+            self._touched.clear()
+
+    def _evict(self, db):
+        excess = db.execute("SELECT count(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            with db:
+                db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used LIMIT ?)", (excess,))
+
+    def close(self):
+        with self.lock:
+            if self._db is not None and self._pid == os.getpid():
+                with self._db:
+                    self._touch(self._db)
+                self._db.close()
+            self._touched.clear()
+            self._db = None
+
+
+results_db = ResultsDB()
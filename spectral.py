@@ -0,0 +1,192 @@
+import numpy as np
+import scipy.sparse as sp
+from numpy import linalg as LA
+from scipy.sparse.csgraph import breadth_first_order, connected_components
+from scipy.sparse.linalg import ArpackNoConvergence, eigs, spsolve
+
+# Matrices up to this size are solved densely; ARPACK needs k < N - 1 anyway
+# and a full eigvals call is cheaper than an Arnoldi run on tiny inputs.
+DENSE_LIMIT = 64
+# eigs needs k < N - 1, so for k = 1 blocks of fewer rows are always dense.
+ARPACK_MIN = 3
+
+
+def spectral_radius(matrix, tol=1e-10, dense_limit=DENSE_LIMIT):
+    """Perron root of a nonnegative square matrix (dense or sparse).
+
+    The matrix is first split into the strongly connected components of its
+    digraph; the spectral radius is the largest over the diagonal blocks.
+    Single-vertex blocks contribute their diagonal entry, and blocks whose
+    row sums cannot beat the best radius so far are skipped. Each remaining
+    block is irreducible and solved on its own, with an implicitly restarted
+    Arnoldi iteration to relative accuracy `tol` (densely up to `dense_limit`
+    rows). For a nonnegative matrix the modulus of the largest eigenvalue is
+    the spectral radius, so the result is always a real float.
+    """
+    if matrix.shape[0] == 0:
+        return 0.0
+    matrix = sp.csr_matrix(matrix, dtype=np.float64)
+    blocks = _Blocks(matrix)
+    if blocks.count == 1:
+        return _block_radius(matrix, tol, dense_limit)
+    return blocks.radius(tol, dense_limit)
+
+
+def perron_vector(matrix, tol=1e-10, dense_limit=DENSE_LIMIT):
+    """(radius, x): the spectral radius as in `spectral_radius` and a
+    nonnegative right eigenvector for it, scaled to sum 1.
+
+    Only the leading eigenpair of one diagonal block is computed: a block of
+    largest radius that no other such block can reach. x is its Perron vector
+    there, zero on the blocks that cannot reach it, and on those that can it
+    solves (r I - A_UU) x_U = A_UB x_B, which is nonsingular because all of
+    them have smaller radii.
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return 0.0, np.zeros(0)
+    matrix = sp.csr_matrix(matrix, dtype=np.float64)
+    blocks = _Blocks(matrix)
+    if blocks.count == 1:
+        radius = _block_radius(matrix, tol, dense_limit)
+        return radius, _block_vector(matrix, radius, tol, dense_limit)
+    radius = blocks.radius(tol, dense_limit)
+    # Every block that might tie with the radius; those not solved by
+    # blocks.radius were skipped for a row-sum bound of exactly the radius.
+    close = radius * (1 - 1e-9)
+    for block in np.flatnonzero(blocks.upper >= close):
+        if block not in blocks.radii:
+            blocks.radii[block] = _block_radius(blocks.submatrix(block), tol, dense_limit)
+    leading = [block for block in np.flatnonzero(blocks.upper >= close) if blocks.radii[block] >= close]
+    # Edges of the condensation point from a block to those reaching it.
+    rows = np.repeat(np.arange(n), np.diff(matrix.indptr))
+    reversed_edges = sp.csr_matrix(
+        (np.ones(matrix.nnz), (blocks.labels[matrix.indices], blocks.labels[rows])),
+        shape=(blocks.count, blocks.count),
+    )
+    target = leading[0]
+    while True:
+        reaching = breadth_first_order(reversed_edges, target, directed=True, return_predecessors=False)
+        others = np.intersect1d(leading, reaching)
+        others = others[others != target]
+        if not len(others):
+            break
+        target = others[0]
+    vertices = blocks.members(target)
+    x = np.zeros(n)
+    x[vertices] = _block_vector(blocks.submatrix(target), radius, tol, dense_limit)
+    upstream = np.flatnonzero(np.isin(blocks.labels, reaching) & (blocks.labels != target))
+    if len(upstream):
+        above = matrix[upstream]
+        system = radius * sp.identity(len(upstream), format="csc") - above[:, upstream].tocsc()
+        x[upstream] = spsolve(system, above[:, vertices] @ x[vertices])
+    x = np.maximum(x, 0.0)
+    return radius, x / x.sum()
+
+
+class _Blocks:
+    # Strongly connected components of a CSR matrix's digraph. Row sums
+    # inside each block bound its radius from above and are exact for
+    # single-vertex blocks.
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        n = matrix.shape[0]
+        self.count, self.labels = connected_components(matrix, directed=True, connection="strong")
+        coo = matrix.tocoo()
+        inside = self.labels[coo.row] == self.labels[coo.col]
+        row_sums = np.bincount(coo.row[inside], weights=coo.data[inside], minlength=n)
+        sizes = np.bincount(self.labels, minlength=self.count)
+        self.upper = np.zeros(self.count)
+        np.maximum.at(self.upper, self.labels, row_sums)
+        self.trivial = sizes == 1
+        self._order = np.argsort(self.labels, kind="stable")
+        self._starts = np.concatenate([[0], np.cumsum(sizes)])
+        self.radii = {block: self.upper[block] for block in np.flatnonzero(self.trivial)}
+
+    def radius(self, tol, dense_limit):
+        # Largest block radius; the solved ones are kept in self.radii.
+        best = float(self.upper[self.trivial].max(initial=0.0))
+        for block in np.argsort(-self.upper, kind="stable"):
+            if self.upper[block] <= best:
+                break
+            if not self.trivial[block]:
+                self.radii[block] = _block_radius(self.submatrix(block), tol, dense_limit)
+                best = max(best, self.radii[block])
+        return best
+
+    def members(self, block):
+        return self._order[self._starts[block]:self._starts[block + 1]]
+
+    def submatrix(self, block):
+        vertices = self.members(block)
+        return self.matrix[vertices][:, vertices]
+
+
+def _block_radius(matrix, tol, dense_limit):
+    if matrix.shape[0] <= max(dense_limit, ARPACK_MIN - 1):
+        return _dense_radius(matrix)
+    try:
+        values = eigs(matrix, k=1, which="LM", tol=tol, return_eigenvectors=False)
+    except ArpackNoConvergence:
+        return _dense_radius(matrix)
+    return float(np.abs(values).max())
+
+
+def _block_vector(matrix, radius, tol, dense_limit):
+    # Perron vector of an irreducible block with the given radius. Periodic
+    # blocks have further eigenvalues of the same modulus, so the one nearest
+    # to the radius is taken, and Arnoldi falls back to a dense solve if it
+    # converged to another.
+    if matrix.shape[0] == 1:
+        return np.ones(1)
+    vector = None
+    if matrix.shape[0] > max(dense_limit, ARPACK_MIN - 1):
+        try:
+            values, vectors = eigs(matrix, k=1, which="LM", tol=tol)
+        except ArpackNoConvergence:
+            pass
+        else:
+            if abs(values[0] - radius) <= 1e-6 * max(radius, 1.0):
+                vector = vectors[:, 0]
+    if vector is None:
+        values, vectors = LA.eig(matrix.toarray())
+        vector = vectors[:, np.argmin(np.abs(values - radius))]
+    vector = np.abs(np.real(vector))
+    return vector / vector.sum()
+
+
+def _dense_radius(matrix):
+    dense = matrix.toarray() if sp.issparse(matrix) else np.asarray(matrix, dtype=np.float64)
+    return float(np.max(np.abs(LA.eigvals(dense))))
+
+
+def perron_bounds(matrix, iterations=8):
+    """Cheap (lower, upper) bounds on the spectral radius of a nonnegative
+    square matrix.
+
+    Starts from the row-sum bounds and tightens them with Collatz–Wielandt
+    quotients min/max (Ax)_i / x_i along a few power iterations: for x >= 0
+    the minimum is a lower bound, for x > 0 the maximum an upper bound.
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return 0.0, 0.0
+    if not sp.issparse(matrix):
+        matrix = np.asarray(matrix, dtype=np.float64)
+    x = np.ones(n)
+    y = np.asarray(matrix @ x, dtype=np.float64).ravel()
+    lower, upper = float(y.min()), float(y.max())
+    for _ in range(iterations):
+        positive = x > 0
+        if not positive.any():
+            break
+        ratios = y[positive] / x[positive]
+        lower = max(lower, float(ratios.min()))
+        if positive.all():
+            upper = min(upper, float(ratios.max()))
+        if upper - lower <= 1e-12 * max(1.0, upper):
+            break
+        x = y / y.max() if y.max() > 0 else y
+        y = np.asarray(matrix @ x, dtype=np.float64).ravel()
+    return lower, upper
@@ -0,0 +1,121 @@
+import numpy as np
+import scipy.sparse as sp
+
+from cliques import pack_masks, signed_clique_complex
+
+# Upper bound on the number of uint64 words touched by one row block.
+BLOCK_WORDS = 1 << 22
+
+
+def member_rows(simplices, v):
+    """Boolean column telling which packed simplices contain vertex v."""
+    return ((simplices[:, v >> 6] >> np.uint64(v & 63)) & np.uint64(1)).astype(bool)
+
+
+def common_links(simplices, adjacency):
+    """Intersection of the neighbourhoods of every vertex in each simplex.
+
+    `simplices` is an (N, W) packed table, `adjacency` the (V, W) packed
+    neighbour masks of the graph the simplices live in.
+    """
+    links = np.full(simplices.shape, np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+    for v in range(adjacency.shape[0]):
+        rows = member_rows(simplices, v)
+        links[rows] &= adjacency[v]
+    return links
+
+
+def inverse_sets(simplices, conflicts):
+    """Union of the conflict masks (the inverse vertices) of each simplex."""
+    inverses = np.zeros(simplices.shape, dtype=np.uint64)
+    for v in range(conflicts.shape[0]):
+        if not conflicts[v].any():
+            continue
+        rows = member_rows(simplices, v)
+        inverses[rows] |= conflicts[v]
+    return inverses
+
+
+def forbidden_sets(simplices, adjacency, conflicts=None):
+    """Vertices a clique move out of each simplex may not add.
+
+    alpha -> beta is allowed iff beta holds no inverse of a vertex of alpha
+    and no vertex of the common link of alpha. A vertex is never in its own
+    link, so the link part already excludes alpha itself.
+    """
+    forbidden = common_links(simplices, adjacency)
+    if conflicts is not None:
+        forbidden |= inverse_sets(simplices, conflicts)
+    return forbidden
+
+
+def iter_transition_blocks(simplices, forbidden, block_rows=None):
+    """Yields (first_row, block) pairs covering the 0/1 transition matrix,
+    `block` being a boolean array of shape (rows, N)."""
+    n, width = simplices.shape
+    if block_rows is None:
+        block_rows = max(1, BLOCK_WORDS // max(1, n * width))
+    for start in range(0, n, block_rows):
+        stop = min(n, start + block_rows)
+        hits = forbidden[start:stop, None, :] & simplices[None, :, :]
+        yield start, ~hits.any(axis=2)
+
+
+def transition_matrix(simplices, forbidden, block_rows=None):
+    n = simplices.shape[0]
+    matrix = np.zeros((n, n), dtype=np.uint8)
+    for start, block in iter_transition_blocks(simplices, forbidden, block_rows):
+        matrix[start:start + block.shape[0]] = block
+    return matrix
+
+
+def clique_move_matrix(adjacency, cliques, conflicts=None, block_rows=None):
+    """Transition matrix of the clique moves between `cliques`.
+
+    `adjacency` and `conflicts` are lists of integer neighbour / inverse
+    bitmasks, `cliques` a list of integer clique bitmasks.
+    """
+    num_bits = len(adjacency)
+    simplices = pack_masks(cliques, num_bits)
+    forbidden = forbidden_sets(
+        simplices,
+        pack_masks(adjacency, num_bits),
+        None if conflicts is None else pack_masks(conflicts, num_bits),
+    )
+    return transition_matrix(simplices, forbidden, block_rows)
+
+
+def transition_csr(simplices, forbidden, block_rows=None, progress=None):
+    """Same matrix as `transition_matrix`, assembled block by block as a
+    scipy CSR matrix so the dense N x N array is never allocated.
+    `progress(rows_done, N)` is called after every block."""
+    blocks = []
+    for start, block in iter_transition_blocks(simplices, forbidden, block_rows):
+        blocks.append(sp.csr_matrix(block, dtype=np.float64))
+        if progress is not None:
+            progress(start + block.shape[0], len(simplices))
+    if not blocks:
+        return sp.csr_matrix((0, 0), dtype=np.float64)
+    return sp.vstack(blocks, format="csr")
+
+
+def blowup_simplices(adjacency):
+    """Packed simplices and forbidden sets of the two point blow-up of the
+    graph with neighbour bitmasks `adjacency`, computed from the base graph.
+
+    Both tables have 2W words per row: the first W hold the positive
+    vertices, the last W the inverse ones. The link of a signed simplex is
+    the common link L of its base clique taken with both signs, and its
+    inverse set swaps the two halves, so a move may not add
+    (L | negative) positively nor (L | positive) inversely.
+    """
+    return blowup_tables(adjacency, *signed_clique_complex(adjacency))
+
+
+def blowup_tables(adjacency, cliques, repeats, positive, negative):
+    """The tables of `blowup_simplices` from the output of
+    `signed_clique_complex(adjacency)`."""
+    links = np.repeat(common_links(cliques, pack_masks(adjacency, len(adjacency))), repeats, axis=0)
+    simplices = np.hstack([positive, negative])
+    forbidden = np.hstack([links | negative, links | positive])
+    return simplices, forbidden